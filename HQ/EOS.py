@@ -1,8 +1,14 @@
 from pythonosc import udp_client
 import logging
 import json
+import multiprocessing
 import os
-from pan_tilt_predictor import PanTiltPredictor
+import time
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock, Thread
+import numpy as np
+from pan_tilt_predictor import PanTiltPredictor, fit_predictor
+from stage_lookup import StageLookupTable
 
 
 
@@ -22,6 +28,40 @@ class EOS(object):
         self.fixture_data = self.load_fixtures()
         self.fixture_positions = {}
         self.current_data = {}
+        # channel -> (calibration key, fitted PanTiltPredictor)
+        self.predictors = {}
+        # Keyword arguments for PanTiltPredictor, e.g. {"outlier_rejection": True}
+        self.predictor_options = {}
+        # channel -> (predictor, stage size, resolution, StageLookupTable)
+        self.lookup_tables = {}
+        self.lookup_resolution = 0.25  # Lookup grid spacing in feet
+        self._sensor_data_mtime = None
+
+        # Online refinement: channel -> last commanded move, see observe_sensor_reading.
+        # Moves are recorded on the GUI thread and read on the sensor thread.
+        self.last_moves = {}
+        self.moves_lock = Lock()
+        self.sensor_baselines = {}
+        self.hit_ratio = 3.0  # A hit reads at least hit_ratio x the sensor's ambient baseline...
+        self.hit_margin = 10.0  # ...and at least hit_margin above it
+        self.correspondence_radius = 1.0  # Max feet between the aimed point and the sensor...
+        self.correspondence_tolerance = 0.5  # ...and max degrees between them as seen from the fixture
+        self.correspondence_settle = 0.5  # Seconds after a move before readings count
+        self.correspondence_expiry = 30.0  # Seconds after a move until readings no longer count
+        self.drift_threshold = 2.0  # Degrees of running prediction error that flag a channel
+        self.drifted_channels = set()
+
+        # Closed-loop targeting: live sensor readings (see attach_sensor_readings), and
+        # the hill-climb that servos a fixture onto a sensor after move_to_point
+        self.live_readings = None
+        self.live_lock = None
+        self.live_sample_times = None
+        self.live_new_sample = None
+        self.servo_radius = 1.0  # Max feet between the aimed point and a sensor to servo onto it
+        self.servo_step = 3.0  # Probe distance in degrees, about half a narrow beam; wider probes average out more noise
+        self.servo_min_step = 0.1  # Degrees; the climb ends after a round that moves less than this
+        self.servo_sample_timeout = 0.5  # Max seconds to wait for a reading after a probe has settled
+        self.servo_timeout = 5.0  # Max seconds for a climb
 
     def load_fixtures(self):
         """
@@ -72,6 +112,82 @@ class EOS(object):
             return tuple(self.fixture_data[channel].get("tilt", (-115, 115)))
         raise ValueError(f"Fixture '{channel}' not found in fixture_data.")
 
+    def get_motion_model(self, channel: str):
+        """
+        Retrieve how fast a fixture moves, from the optional "pan_speed" and
+        "tilt_speed" (degrees per second) and "latency" (seconds from command to
+        motion) keys of its fixture data.
+
+        Returns:
+        - Tuple of (pan_speed, tilt_speed, latency).
+        """
+        if channel in self.fixture_data:
+            fixture = self.fixture_data[channel]
+            return (
+                float(fixture.get("pan_speed", 60.0)),
+                float(fixture.get("tilt_speed", 60.0)),
+                float(fixture.get("latency", 0.1)),
+            )
+        raise ValueError(f"Fixture '{channel}' not found in fixture_data.")
+
+    def get_scan_steps(self, channel: str):
+        """
+        Retrieve the smallest and largest scan step in degrees for a fixture, from the
+        optional "min_step" and "max_step" keys of its fixture data. The largest step
+        should stay below the beam width so that a stride can't skip over a sensor.
+
+        Returns:
+        - Tuple of (min_step, max_step).
+        """
+        if channel in self.fixture_data:
+            fixture = self.fixture_data[channel]
+            min_step = float(fixture.get("min_step", 1.0))
+            max_step = float(fixture.get("max_step", 4.0))
+            if not 0 < min_step <= max_step:
+                raise ValueError(f"Fixture '{channel}' needs 0 < min_step <= max_step, got {min_step} and {max_step}.")
+            return min_step, max_step
+        raise ValueError(f"Fixture '{channel}' not found in fixture_data.")
+
+    def get_settle_model(self, channel: str):
+        """
+        Retrieve a fixture's measured timing (see Navigator.self_test), or None if it
+        hasn't been measured.
+
+        Returns:
+        - Dict with "light_latency", "settle_base" and "settle_per_degree" in seconds.
+        """
+        if channel not in self.fixture_data:
+            raise ValueError(f"Fixture '{channel}' not found in fixture_data.")
+        return self.fixture_data[channel].get("settle_model")
+
+    def set_settle_model(self, channel: str, model: dict) -> None:
+        """
+        Stores a fixture's measured timing with its fixture data in .fixtures.json.
+        """
+        if channel not in self.fixture_data:
+            raise ValueError(f"Fixture '{channel}' not found in fixture_data.")
+        self.fixture_data[channel]["settle_model"] = dict(model)
+        self.save_fixtures()
+
+    def get_zoom_settings(self, channel: str):
+        """
+        Retrieve a fixture's beam settings for zoom-assisted searching, from the optional
+        "zoom_wide" and "zoom_narrow" keys of its fixture data (values of the
+        "zoom_parameter" key, "zoom" by default, e.g. beam angles in degrees).
+
+        Returns:
+        - Tuple of (parameter, wide, narrow), or None if the fixture has no zoom settings.
+        """
+        if channel not in self.fixture_data:
+            raise ValueError(f"Fixture '{channel}' not found in fixture_data.")
+        fixture = self.fixture_data[channel]
+        if "zoom_wide" not in fixture or "zoom_narrow" not in fixture:
+            return None
+        wide, narrow = float(fixture["zoom_wide"]), float(fixture["zoom_narrow"])
+        if not 0 < narrow <= wide:
+            raise ValueError(f"Fixture '{channel}' needs 0 < zoom_narrow <= zoom_wide, got {narrow} and {wide}.")
+        return fixture.get("zoom_parameter", "zoom"), wide, narrow
+
     def send(self, message: str, value: str or int or float):
         self.client.send_message(message, value)
 
@@ -117,7 +233,7 @@ class EOS(object):
     def get_tilt(self, channel: int) -> float:
         return self.current_data[channel]["tilt"]
 
-    def set_sensor_data(self, sensor_id: int, pan: float, tilt: float, direction: int, channel) -> None:
+    def set_sensor_data(self, sensor_id: int, pan: float, tilt: float, direction: int, channel, confidence: float = None) -> None:
 
         if channel not in self.sensor_data:
             self.sensor_data[channel] = {}
@@ -126,6 +242,9 @@ class EOS(object):
             self.sensor_data[channel][sensor_id] = {}
 
         self.sensor_data[channel][sensor_id] = {"pan": pan, "tilt": tilt, "direction": direction}
+        if confidence is not None:
+            self.sensor_data[channel][sensor_id]["confidence"] = confidence
+        self.invalidate_predictor(channel)
 
         # write to local .sensors file
         with open(".sensors.json", "w") as f:
@@ -140,6 +259,40 @@ class EOS(object):
 
         return self.sensor_data[channel][str(sensor_id)]
 
+    def get_overshoot_model(self, channel, overshoot_file: str = ".overshoot.json"):
+        """
+        Returns the channel's fitted (k0, k1, k2, k3) pan overshoot coefficients, or None.
+        """
+        if not os.path.exists(overshoot_file):
+            return None
+        with open(overshoot_file, "r") as f:
+            return json.load(f).get(str(channel))
+
+    def set_overshoot_model(self, channel, coefficients, overshoot_file: str = ".overshoot.json") -> None:
+        """
+        Stores the channel's fitted pan overshoot coefficients next to the sensor calibration.
+        """
+        models = {}
+        if os.path.exists(overshoot_file):
+            with open(overshoot_file, "r") as f:
+                models = json.load(f)
+        models[str(channel)] = list(coefficients)
+        with open(overshoot_file, "w") as f:
+            json.dump(models, f, indent=4)
+
+    def load_archived_sensor_data(self, archive_file: str = ".sensors_archive.json") -> dict:
+        """
+        Loads the previous calibration archived by a recalibration, or {} if there is none.
+        """
+        if not os.path.exists(archive_file):
+            return {}
+        try:
+            with open(archive_file, "r") as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            logging.error(f"Failed to decode {archive_file}.")
+            return {}
+
     def sensors_data_file_is_valid(self) -> bool:
         if os.path.exists(".sensors.json"):
             with open(".sensors.json", "r") as f:
@@ -162,25 +315,307 @@ class EOS(object):
                 raise ValueError(f"Requested move {move_value}% results in {new_value}°, which is out of range ({min_value}° to {max_value}°)")
             return float(new_value)
 
-    def move_to_point(self, x, y, stage_max_y, sensor_coords: dict, channel: int):
+    def move_to_point(self, x, y, stage_max_y, sensor_coords: dict, channel: int, servo: bool = False):
         """
         Expects sensor_coords to be a dictionary with sensor_id as key and a tuple of (x, y) as value.
-        """
-        sensor1_data = self.get_sensor_data(1, channel)
-        sensor2_data = self.get_sensor_data(2, channel)
-        sensor3_data = self.get_sensor_data(3, channel)
-        sensor4_data = self.get_sensor_data(4, channel)
 
-        reference_point1 = (sensor_coords[1][0], sensor_coords[1][1], sensor1_data["pan"], sensor1_data["tilt"])
-        reference_point2 = (sensor_coords[2][0], sensor_coords[2][1], sensor2_data["pan"], sensor2_data["tilt"])
-        reference_point3 = (sensor_coords[3][0], sensor_coords[3][1], sensor3_data["pan"], sensor3_data["tilt"])
-        reference_point4 = (sensor_coords[4][0], sensor_coords[4][1], sensor4_data["pan"], sensor4_data["tilt"])
+        With servo, if the point is within servo_radius of a sensor, the fixture is then
+        servoed onto that sensor using live readings (see servo_to_sensor) and the hit is
+        added to the channel's predictor. If the point isn't the sensor itself, the
+        fixture is then re-aimed with the refined predictor, offset by its remaining
+        error at the sensor. The climb waits for readings, so it runs on its own thread
+        and is abandoned if the channel is moved again in the meantime.
 
-        pan, tilt = self.predict(x, y, reference_point1, reference_point2, reference_point3, reference_point4, stage_max_y)
+        Returns:
+        - The servo Thread, or None if there is nothing to servo.
+        """
+        reference_points = self.get_reference_points(sensor_coords, channel, stage_max_y)
+
+        pan, tilt = self.predict(x, y, reference_points, stage_max_y, channel=channel)
         print(f"Pan: {pan}, Tilt: {tilt}")
         pan, tilt = self._get_nearest_pan_tilt(channel, pan, tilt)
+        previous = self.current_data.get(channel, {})
+        settled = time.monotonic() + self._settle_time(channel, abs(pan - previous.get("pan", pan)), abs(tilt - previous.get("tilt", tilt)))
         self.set_pan(channel, 0, pan, use_degrees=True)
         self.set_tilt(channel, 0, tilt, use_degrees=True)
+        move = self._record_move(channel, x, y, pan, tilt, sensor_coords, stage_max_y)
+
+        if not servo:
+            return None
+        sensor_id = self._nearest_sensor(x, y, sensor_coords)
+        if sensor_id is None:
+            logging.info(f"No sensor within {self.servo_radius} ft of ({x}, {y}) to servo onto.")
+            return None
+        thread = Thread(target=self._servo_and_reaim, args=(x, y, stage_max_y, sensor_coords, channel, sensor_id, move, settled), daemon=True)
+        thread.start()
+        return thread
+
+    def _servo_and_reaim(self, x, y, stage_max_y, sensor_coords: dict, channel, sensor_id, move: dict, settled: float) -> None:
+        """
+        The closed-loop part of move_to_point, climbing from the sensor's predicted
+        position.
+        """
+        # The predictor works in the stage frame (see get_reference_points)
+        sensor_x, sensor_y = sensor_coords[sensor_id][0], self.invert_y(sensor_coords[sensor_id][1], stage_max_y)
+        predictor = self.predictors[channel][1]
+        sensor_pan, sensor_tilt = self._get_nearest_pan_tilt(channel, *predictor.predict_pan_tilt(sensor_x, sensor_y))
+        hit = self.servo_to_sensor(channel, sensor_id, sensor_pan, sensor_tilt, move=move, settled=settled)
+        if hit is None:
+            return
+
+        hit_pan, hit_tilt = hit
+        error = predictor.add_observation(sensor_x, sensor_y, hit_pan, hit_tilt)
+        self.lookup_tables.pop(channel, None)
+        logging.info(f"Channel {channel}: servoed onto sensor {sensor_id}, prediction error {error:.2f}°, light position {predictor.get_light_position()}")
+
+        if np.isclose(x, sensor_coords[sensor_id][0]) and np.isclose(y, sensor_coords[sensor_id][1]):
+            move = self._record_move(channel, x, y, hit_pan, hit_tilt, sensor_coords, stage_max_y)
+        else:
+            # The refined model's remaining error at the sensor also applies close by
+            sensor_pan, sensor_tilt = self._get_nearest_pan_tilt(channel, *predictor.predict_pan_tilt(sensor_x, sensor_y))
+            pan, tilt = self._get_nearest_pan_tilt(channel, *predictor.predict_pan_tilt(x, self.invert_y(y, stage_max_y)))
+            pan, tilt = self._get_nearest_pan_tilt(channel, pan + hit_pan - sensor_pan, tilt + hit_tilt - sensor_tilt)
+            self.set_pan(channel, 0, pan, use_degrees=True)
+            self.set_tilt(channel, 0, tilt, use_degrees=True)
+            move = self._record_move(channel, x, y, pan, tilt, sensor_coords, stage_max_y)
+        # The servoed hit is already in the predictor
+        with self.moves_lock:
+            move["observed"].add(sensor_id)
+
+    def attach_sensor_readings(self, sensor_data: dict, lock, sample_times: dict = None, new_sample=None) -> None:
+        """
+        Gives EOS access to the live sensor readings (sensor_id -> intensity, guarded
+        by lock) for closed-loop targeting, with the time (time.monotonic) of the
+        oldest reading behind each value and a Condition on lock notified when they
+        change, so that a probe can wait for readings taken after it settled.
+        """
+        self.live_readings = sensor_data
+        self.live_lock = lock
+        self.live_sample_times = sample_times
+        self.live_new_sample = new_sample
+
+    def _nearest_sensor(self, x, y, sensor_coords: dict):
+        """
+        The id of the sensor nearest to (x, y) within servo_radius feet, or None.
+        """
+        nearest, nearest_distance = None, self.servo_radius
+        for sensor_id, (sensor_x, sensor_y) in sensor_coords.items():
+            distance = np.hypot(sensor_x - x, sensor_y - y)
+            if distance <= nearest_distance:
+                nearest, nearest_distance = sensor_id, distance
+        return nearest
+
+    @staticmethod
+    def _sensor_value(values: dict, sensor_id, default=None):
+        for key, value in values.items():
+            if str(key) == str(sensor_id):
+                return value
+        return default
+
+    def _live_reading(self, sensor_id, since=None):
+        """
+        The live reading of a sensor, or None. If since (time.monotonic) is given, waits
+        for a reading taken at or after it, as Navigator.wait_for_samples does, and
+        returns None if there is none servo_sample_timeout after since. Without
+        sample times it just sleeps until since.
+        """
+        if since is not None:
+            if self.live_sample_times is None or self.live_new_sample is None:
+                time.sleep(max(0.0, since - time.monotonic()))
+            else:
+                timeout = max(0.0, since - time.monotonic()) + self.servo_sample_timeout
+                with self.live_new_sample:
+                    fresh = self.live_new_sample.wait_for(
+                        lambda: self._sensor_value(self.live_sample_times, sensor_id, -np.inf) >= since, timeout=timeout)
+                if not fresh:
+                    return None
+        with self.live_lock:
+            return self._sensor_value(self.live_readings, sensor_id)
+
+    def servo_to_sensor(self, channel, sensor_id, pan: float, tilt: float, move: dict = None, settled: float = None):
+        """
+        Climbs a lit fixture from pan/tilt onto the peak of a sensor's live readings.
+
+        Each round probes the four neighbours servo_step degrees of beam movement away
+        in pan and tilt.
+        Along each axis the fixture jumps to the vertex of a parabola through the logs
+        of the three readings above the ambient baseline, which is exact for a Gaussian
+        beam, so the step stays the same. The jump is limited to servo_step if the
+        centre is the brightest reading and to four times that otherwise, and the climb
+        ends once a round moves less than servo_min_step or after servo_timeout seconds.
+        Each probe reads the first sample taken after the fixture settled, and not
+        before settled (time.monotonic) if its last move is still under way.
+        If move (an entry of last_moves) is given, the climb is abandoned once the
+        channel is moved again.
+
+        Returns:
+        - Tuple (pan, tilt) of the peak, or None if there are no live readings, the
+          climb was abandoned, or the sensor isn't lit (see observe_sensor_reading) at
+          the peak.
+        """
+        if self.live_readings is None:
+            logging.warning("No live sensor readings attached; cannot servo.")
+            return None
+
+        pan_min, pan_max = self.get_pan_range(str(channel))
+        tilt_min, tilt_max = self.get_tilt_range(str(channel))
+        baseline = next((value for key, value in self.sensor_baselines.items() if str(key) == str(sensor_id)), None)
+        # Where the fixture was last sent, and when it gets there
+        current = [self.current_data.get(channel, {}).get("pan", pan), self.current_data.get(channel, {}).get("tilt", tilt)]
+        settled = time.monotonic() if settled is None else settled
+
+        def superseded():
+            with self.moves_lock:
+                return move is not None and self.last_moves.get(channel) is not move
+
+        def probe(probe_pan, probe_tilt):
+            if superseded():
+                return None
+            pan_distance, tilt_distance = abs(probe_pan - current[0]), abs(probe_tilt - current[1])
+            self.set_pan(channel, 0, probe_pan, use_degrees=True)
+            self.set_tilt(channel, 0, probe_tilt, use_degrees=True)
+            current[:] = probe_pan, probe_tilt
+            return self._live_reading(sensor_id, since=max(settled, time.monotonic() + self._settle_time(channel, pan_distance, tilt_distance)))
+
+        def vertex(below, centre, above, step):
+            # Log readings above the ambient baseline, so a Gaussian beam gives a parabola
+            floor = (baseline or 0.0) + 1e-9
+            below, centre, above = (np.log(max(value - floor, 1e-9)) for value in (below, centre, above))
+            brightest = centre >= max(below, above)
+            curvature = below - 2 * centre + above
+            if curvature >= 0:
+                return 0.0 if brightest else float(np.copysign(step, above - below))
+            limit = step if brightest else 4 * step
+            return float(np.clip(step * (below - above) / (2 * curvature), -limit, limit))
+
+        start = time.monotonic()
+        best = probe(pan, tilt)
+        if best is None:
+            logging.warning(f"No live readings from sensor {sensor_id}; cannot servo.")
+            return None
+
+        step = self.servo_step
+        while time.monotonic() - start < self.servo_timeout:
+            # A degree of pan turns the beam by sin(tilt) degrees
+            pan_step = step / max(abs(np.sin(np.radians(tilt))), 0.25)
+            pan_below, pan_above = (float(np.clip(pan + offset, pan_min, pan_max)) for offset in (-pan_step, pan_step))
+            tilt_below, tilt_above = (float(np.clip(tilt + offset, tilt_min, tilt_max)) for offset in (-step, step))
+            readings = [probe(pan_below, tilt), probe(pan_above, tilt), probe(pan, tilt_below), probe(pan, tilt_above)]
+            if None in readings:
+                break
+            pan_offset = vertex(readings[0], best, readings[1], pan_step)
+            tilt_offset = vertex(readings[2], best, readings[3], step)
+            pan = float(np.clip(pan + pan_offset, pan_min, pan_max))
+            tilt = float(np.clip(tilt + tilt_offset, tilt_min, tilt_max))
+            best = probe(pan, tilt)
+            if best is None or max(abs(pan_offset) * step / pan_step, abs(tilt_offset)) < self.servo_min_step:
+                break
+
+        if superseded():
+            logging.info(f"Channel {channel} was moved again; servo onto sensor {sensor_id} abandoned.")
+            return None
+        if best is None or (baseline is not None and best < max(self.hit_ratio * baseline, baseline + self.hit_margin)):
+            logging.warning(f"Sensor {sensor_id} isn't lit by channel {channel} near its predicted position; servo abandoned.")
+            return None
+        logging.info(f"Channel {channel} servoed onto sensor {sensor_id} at pan {pan:.2f}°, tilt {tilt:.2f}° in {time.monotonic() - start:.2f}s")
+        return pan, tilt
+
+    def _settle_time(self, channel, pan_distance: float, tilt_distance: float) -> float:
+        """
+        Seconds for the fixture to settle after a move, as Navigator.settle_time: from
+        the measured settle model, or else the motion model.
+        """
+        settle_model = self.get_settle_model(str(channel))
+        if settle_model is None:
+            pan_speed, tilt_speed, latency = self.get_motion_model(str(channel))
+            return latency + max(pan_distance / pan_speed, tilt_distance / tilt_speed)
+        return settle_model["settle_base"] + settle_model["settle_per_degree"] * max(pan_distance, tilt_distance)
+
+    def _record_move(self, channel, x, y, pan, tilt, sensor_coords: dict, stage_max_y) -> dict:
+        """
+        Records a move to the GUI point (x, y), in the predictor's stage frame (see get_reference_points).
+        """
+        with self.moves_lock:
+            move = self.last_moves[channel] = {
+                "x": x,
+                "y": self.invert_y(y, stage_max_y),
+                "pan": pan,
+                "tilt": tilt,
+                "sensor_coords": {sensor_id: (sensor_x, self.invert_y(sensor_y, stage_max_y)) for sensor_id, (sensor_x, sensor_y) in sensor_coords.items()},
+                "time": time.monotonic(),
+                "observed": set(),
+            }
+        return move
+
+    def observe_sensor_reading(self, sensor_id: int, intensity: float) -> None:
+        """
+        Feeds a live sensor reading into online calibration refinement.
+
+        A reading well above the sensor's ambient baseline while a channel was last
+        moved to a point on that sensor confirms that the channel's commanded pan/tilt
+        hits the sensor. The point must be within correspondence_radius feet of the
+        sensor and within correspondence_tolerance degrees of it as seen from the
+        fixture (well below drift_threshold, as the aim counts as an exact hit), and the
+        move between correspondence_settle and correspondence_expiry seconds old. The
+        correspondence is added to the channel's cached predictor, and channels whose
+        running prediction error exceeds drift_threshold are added to drifted_channels.
+        """
+        baseline = self.sensor_baselines.get(sensor_id)
+        if baseline is None:
+            self.sensor_baselines[sensor_id] = intensity
+            return
+
+        if intensity < max(self.hit_ratio * baseline, baseline + self.hit_margin):
+            self.sensor_baselines[sensor_id] = 0.9 * baseline + 0.1 * intensity
+            return
+
+        now = time.monotonic()
+        with self.moves_lock:
+            moves = list(self.last_moves.items())
+        candidates = []
+        for channel, move in moves:
+            sensor_position = move["sensor_coords"].get(sensor_id)
+            if sensor_position is None or sensor_id in move["observed"]:
+                continue
+            if not self.correspondence_settle <= now - move["time"] <= self.correspondence_expiry:
+                continue
+            if np.hypot(move["x"] - sensor_position[0], move["y"] - sensor_position[1]) <= self.correspondence_radius:
+                candidates.append((channel, move))
+
+        # Several fixtures aimed at the same sensor can't be told apart
+        if len(candidates) != 1 or candidates[0][0] not in self.predictors:
+            return
+
+        channel, move = candidates[0]
+        predictor = self.predictors[channel][1]
+        separation = self._angular_separation(predictor.get_light_position(), (move["x"], move["y"]), move["sensor_coords"][sensor_id])
+        if separation > self.correspondence_tolerance:
+            logging.debug(f"Channel {channel} aimed {separation:.2f}° from sensor {sensor_id}; not a confirmed hit")
+            return
+        move["observed"].add(sensor_id)
+        sensor_x, sensor_y = move["sensor_coords"][sensor_id]
+        error = predictor.add_observation(sensor_x, sensor_y, move["pan"], move["tilt"])
+        self.lookup_tables.pop(channel, None)
+        logging.info(f"Channel {channel}: sensor {sensor_id} confirmed, prediction error {error:.2f}°, light position {predictor.get_light_position()}")
+
+        if predictor.drift_detected(self.drift_threshold):
+            self.drifted_channels.add(channel)
+            logging.warning(f"Channel {channel} has drifted: running error {predictor.drift:.2f}° exceeds {self.drift_threshold}°")
+            # Enough confirmed hits since the bump replace the stale calibration outright
+            if predictor.rebase_on_observations():
+                logging.info(f"Channel {channel} refitted from live observations: light position {predictor.get_light_position()}")
+        elif predictor.drift is not None:
+            self.drifted_channels.discard(channel)
+
+    @staticmethod
+    def _angular_separation(light_position, point_a, point_b) -> float:
+        """
+        Degrees between two stage points as seen from a light at (Lx, Ly, h).
+        """
+        Lx, Ly, h = light_position
+        a = np.array([point_a[0] - Lx, point_a[1] - Ly, -h], dtype=float)
+        b = np.array([point_b[0] - Lx, point_b[1] - Ly, -h], dtype=float)
+        return float(np.degrees(np.arccos(np.clip(a @ b / (np.linalg.norm(a) * np.linalg.norm(b)), -1, 1))))
 
     def _get_nearest_pan_tilt(self, channel: int, target_pan: float, target_tilt: float) -> tuple:
             pan_min, pan_max = self.get_pan_range(str(channel))
@@ -188,40 +623,198 @@ class EOS(object):
             current_pan = self.current_data.get(channel, {}).get("pan", 0.0)
             current_tilt = self.current_data.get(channel, {}).get("tilt", 0.0)
 
-            equivalents = [(target_pan, target_tilt)]
-            if target_pan > 90 or target_pan < -90:
-                adjusted_pan = target_pan - 180 if target_pan > 90 else target_pan + 180
-                adjusted_tilt = -target_tilt
-                equivalents.append((adjusted_pan, adjusted_tilt))
+            nearest_pan, nearest_tilt = PanTiltPredictor.nearest_equivalent_pan_tilt(
+                target_pan, target_tilt, (pan_min, pan_max), (tilt_min, tilt_max), current_pan, current_tilt
+            )
 
-            all_equivalents = []
-            for p, t in equivalents:
-                for k in range(-1, 2):
-                    p_equiv = p + k * 360
-                    all_equivalents.append((p_equiv, t))
+            if np.isnan(nearest_pan):
+                raise ValueError(f"No valid pan/tilt found for target_pan {target_pan}° and target_tilt {target_tilt}° within pan range ({pan_min}°, {pan_max}°) and tilt range ({tilt_min}°, {tilt_max}°)")
 
-            valid_pans_tilts = [
-                (p, t) for p, t in all_equivalents
-                if pan_min <= p <= pan_max and tilt_min <= t <= tilt_max
-            ]
+            return float(nearest_pan), float(nearest_tilt)
 
-            if not valid_pans_tilts:
-                raise ValueError(f"No valid pan/tilt found for target_pan {target_pan}° and target_tilt {target_tilt}° within pan range ({pan_min}°, {pan_max}°) and tilt range ({tilt_min}°, {tilt_max}°)")
+    def predict_batch(self, target_x, target_y, stage_max_y, sensor_coords: dict, channel):
+        """
+        Predicts fixture pan/tilt for arrays of stage points in one vectorized pass,
+        e.g. for focus point lists, cue paths or coverage grids.
 
-            nearest_pan_tilt = min(
-                valid_pans_tilts,
-                key=lambda pt: abs(pt[0] - current_pan) + abs(pt[1] - current_tilt)
-            )
+        Each prediction is resolved to the equivalent position within the channel's
+        pan/tilt limits nearest to its current position. Returns NumPy arrays of pan
+        and tilt; points the fixture cannot reach are NaN.
+        """
+        reference_points = self.get_reference_points(sensor_coords, channel, stage_max_y)
+        predictor = self.get_predictor(channel, reference_points, stage_max_y)
+        target_y = self.invert_y(np.asarray(target_y, dtype=float), stage_max_y)
 
-            return nearest_pan_tilt
+        return predictor.predict_pan_tilt_batch(
+            target_x,
+            target_y,
+            pan_range=self.get_pan_range(str(channel)),
+            tilt_range=self.get_tilt_range(str(channel)),
+            current_pan=self.current_data.get(channel, {}).get("pan", 0.0),
+            current_tilt=self.current_data.get(channel, {}).get("tilt", 0.0),
+        )
 
 
     @staticmethod
     def invert_y(y, max_y):
         return max_y - y
 
-    def predict(self, target_x, target_y, reference_point1: tuple, reference_point2: tuple, reference_point3: tuple, reference_point4: tuple, stage_max_y):
-        predictor = PanTiltPredictor([reference_point1, reference_point2, reference_point3, reference_point4])
+    def get_reference_points(self, sensor_coords: dict, channel, stage_max_y) -> list:
+        """
+        Builds the (x, y, pan, tilt) reference points for a channel from the
+        calibrated sensor data and the sensor stage coordinates. Sensors without
+        calibration data for the channel are skipped. .sensors.json is read once per call.
+
+        The GUI's y grows down the screen, so y is inverted against stage_max_y here:
+        predictors are fitted, and targets predicted (see predict), in that stage frame.
+        """
+        self._reload_sensor_data_if_changed()
+        channel_data = self.sensor_data[channel]
+        reference_points = []
+        for sensor_id in sorted(sensor_coords):
+            sensor = channel_data.get(str(sensor_id))
+            if sensor is None:
+                continue
+            reference_points.append((sensor_coords[sensor_id][0], self.invert_y(sensor_coords[sensor_id][1], stage_max_y), sensor["pan"], sensor["tilt"]))
+        return reference_points
+
+    def _reload_sensor_data_if_changed(self) -> None:
+        """
+        Reloads .sensors.json only when its modification time changed since the last load.
+        """
+        if not os.path.exists(".sensors.json"):
+            self._sensor_data_mtime = None
+            raise ValueError("Invalid sensor data file or sensor data not found.")
+
+        mtime = os.stat(".sensors.json").st_mtime_ns
+        if mtime != self._sensor_data_mtime:
+            with open(".sensors.json", "r") as f:
+                self.sensor_data = json.load(f)
+            self._sensor_data_mtime = mtime
+
+    def get_predictor(self, channel, reference_points: list, stage_max_y) -> PanTiltPredictor:
+        """
+        Returns the fitted PanTiltPredictor for a channel, fitting a new one only
+        when the calibration (reference points, sensor layout or stage height)
+        differs from the one the cached predictor was fitted with.
+        """
+        key = (tuple(tuple(point) for point in reference_points), stage_max_y)
+        cached = self.predictors.get(channel)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        predictor = PanTiltPredictor(list(reference_points), **self.predictor_options)
+        self.predictors[channel] = (key, predictor)
+        logging.info(f"Fitted predictor for channel {channel}: light position {predictor.get_light_position()}")
+        if predictor.rejected_indices:
+            logging.warning(f"Channel {channel}: rejected reference points {predictor.get_rejected_points()}")
+        return predictor
+
+    def calibrate_all(self, sensor_coords: dict, stage_max_y, max_workers=None) -> dict:
+        """
+        Fits the predictor of every fixture concurrently in a process pool and caches
+        the results, so later moves don't have to fit. The fits take a while, so call
+        it off the GUI thread. The pool's workers are spawned rather than forked, as
+        forking copies the caller's other threads' locks in whatever state they are in.
+
+        Returns a dict keyed by channel with "light_position", "fit_time" (seconds),
+        "residuals" ((pan, tilt) error in degrees per reference point) and
+        "rejected_points", or "error" if the channel could not be calibrated.
+        """
+        start = time.perf_counter()
+        results = {}
+        jobs = {}
+        for channel in self.get_list_of_fixtures():
+            try:
+                reference_points = self.get_reference_points(sensor_coords, channel, stage_max_y)
+            except (KeyError, ValueError) as e:
+                results[channel] = {"error": f"No calibration data: {e}"}
+                continue
+            jobs[channel] = reference_points
+
+        # Candidate solves of outlier rejection would otherwise start a pool per worker
+        options = dict(self.predictor_options)
+        if options.get("outlier_rejection"):
+            options["n_jobs"] = 1
+
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = {channel: executor.submit(fit_predictor, points, options) for channel, points in jobs.items()}
+            for channel, future in futures.items():
+                try:
+                    predictor, fit_time = future.result()
+                except (RuntimeError, ValueError) as e:
+                    results[channel] = {"error": str(e)}
+                    logging.error(f"Calibration failed for channel {channel}: {e}")
+                    continue
+
+                key = (tuple(tuple(point) for point in jobs[channel]), stage_max_y)
+                self.predictors[channel] = (key, predictor)
+                self.lookup_tables.pop(channel, None)
+                results[channel] = {
+                    "light_position": tuple(float(v) for v in predictor.get_light_position()),
+                    "fit_time": fit_time,
+                    "residuals": predictor.residuals().tolist(),
+                    "rejected_points": predictor.get_rejected_points(),
+                }
+
+        logging.info(f"Calibrated {len(jobs)} fixtures in {time.perf_counter() - start:.2f}s")
+        return results
+
+    def invalidate_predictor(self, channel=None) -> None:
+        """
+        Drops the cached predictor and lookup table for a channel, or for every channel if none is given.
+        """
+        if channel is None:
+            self.predictors.clear()
+            self.lookup_tables.clear()
+        else:
+            self.predictors.pop(channel, None)
+            self.lookup_tables.pop(channel, None)
+
+    def get_lookup_table(self, channel, sensor_coords: dict, stage_max_x, stage_max_y) -> StageLookupTable:
+        """
+        Returns the channel's precomputed stage lookup table, rebuilding it only when the
+        fitted predictor, the stage size or lookup_resolution changed.
+        """
+        reference_points = self.get_reference_points(sensor_coords, channel, stage_max_y)
+        predictor = self.get_predictor(channel, reference_points, stage_max_y)
+
+        cached = self.lookup_tables.get(channel)
+        if cached is not None and cached[0] is predictor and cached[1] == (stage_max_x, stage_max_y) and cached[2] == self.lookup_resolution:
+            return cached[3]
+
+        table = StageLookupTable(
+            predictor,
+            stage_max_x,
+            stage_max_y,
+            resolution=self.lookup_resolution,
+            pan_range=self.get_pan_range(str(channel)),
+            tilt_range=self.get_tilt_range(str(channel)),
+        )
+        self.lookup_tables[channel] = (predictor, (stage_max_x, stage_max_y), self.lookup_resolution, table)
+        logging.info(f"Built {table.pan.shape[1]}x{table.pan.shape[0]} lookup table for channel {channel}")
+        return table
+
+    def track_point(self, x, y, stage_max_x, stage_max_y, sensor_coords: dict, channel):
+        """
+        Points the fixture at a stage point using the channel's lookup table, for live
+        tracking at high rates. Unlike move_to_point the pan/tilt branch is the one
+        precomputed in the table rather than the one nearest the current position.
+        """
+        table = self.get_lookup_table(channel, sensor_coords, stage_max_x, stage_max_y)
+        pan, tilt = table.lookup(x, self.invert_y(y, stage_max_y))
+        if np.isnan(pan) or np.isnan(tilt):
+            raise ValueError(f"No valid pan/tilt found for stage point ({x}, {y}) on channel {channel}")
+
+        self.set_pan(channel, 0, float(pan), use_degrees=True)
+        self.set_tilt(channel, 0, float(tilt), use_degrees=True)
+        self._record_move(channel, x, y, float(pan), float(tilt), sensor_coords, stage_max_y)
+
+    def predict(self, target_x, target_y, reference_points: list, stage_max_y, channel=None):
+        if channel is None:
+            predictor = PanTiltPredictor(reference_points)
+        else:
+            predictor = self.get_predictor(channel, reference_points, stage_max_y)
 
         pan, tilt = predictor.predict_pan_tilt(target_x, self.invert_y(target_y, stage_max_y))
         return pan, tilt
@@ -11,6 +11,7 @@ from PyQt5.QtCore import pyqtSignal, QPointF, QRectF
 import sys
 import logging
 import os
+import threading
 
 
 class SensorGUI(QtWidgets.QWidget):
@@ -18,6 +19,8 @@ class SensorGUI(QtWidgets.QWidget):
     Main GUI class for sensor positioning and ground plan management.
     """
 
+    calibration_finished = pyqtSignal(object)  # calibrate_all results, or the exception that stopped it
+
     def __init__(self, eos=None, recalibrate_state=None):
         super().__init__()
         self.eos = eos
@@ -187,6 +190,15 @@ class SensorGUI(QtWidgets.QWidget):
         self.edit_sensors_button.setGeometry(220, 820, 200, 30)
         self.edit_sensors_button.clicked.connect(self.open_sensors_editor)
 
+        self.calibrate_all_button = QtWidgets.QPushButton("Calibrate All", self)
+        self.calibrate_all_button.setGeometry(430, 820, 200, 30)
+        self.calibrate_all_button.clicked.connect(self.calibrate_all)
+        self.calibration_finished.connect(self.report_calibration)
+
+        # Servo clicked moves onto the nearest sensor using live readings
+        self.servo_checkbox = QtWidgets.QCheckBox("Servo Onto Sensors", self)
+        self.servo_checkbox.setGeometry(640, 820, 200, 30)
+
 
 
     def get_channels_list(self):
@@ -398,10 +410,59 @@ class SensorGUI(QtWidgets.QWidget):
         logging.info("Scale applied.")
 
     def recalibrate(self):
-        # delete file ".sensors.json"
-        os.remove(".sensors.json")
+        # archive ".sensors.json" so the navigator can touch up around the previous calibration
+        os.replace(".sensors.json", ".sensors_archive.json")
         QMessageBox.information(self, "Recalibrate", "Recalibration in progress for all fixtures.")
 
+    def calibrate_all(self):
+        """
+        Fits the pan/tilt model of every fixture in parallel on a worker thread, so the GUI
+        stays responsive; the results arrive through calibration_finished.
+        """
+        positions = self.get_sensor_positions_feet()
+        stage_height = self.get_stage_size_feet()[1]
+        self.calibrate_all_button.setEnabled(False)
+        self.progress_label.setText("Status: Calibrating all fixtures...")
+        threading.Thread(target=self._calibrate_all_worker, args=(positions, stage_height), daemon=True).start()
+
+    def _calibrate_all_worker(self, positions, stage_height):
+        """
+        Runs EOS.calibrate_all off the GUI thread and emits its results.
+
+        Parameters:
+        - positions: Dictionary of sensor positions in feet, as shown on the ground plan.
+        - stage_height: Height of the stage in feet.
+        """
+        try:
+            results = self.eos.calibrate_all(positions, stage_height)
+        except (OSError, RuntimeError, ValueError) as e:
+            logging.error(f"Calibrate all failed: {e}")
+            results = e
+        self.calibration_finished.emit(results)
+
+    def report_calibration(self, results):
+        """
+        Summarizes the results of calibrate_all on the GUI thread.
+
+        Parameters:
+        - results: Dictionary of per-channel results from EOS.calibrate_all, or the exception
+          that stopped it.
+        """
+        self.calibrate_all_button.setEnabled(True)
+        if isinstance(results, Exception):
+            self.progress_label.setText("Status: Calibration failed.")
+            QMessageBox.warning(self, "Calibrate All", f"Calibration failed: {results}")
+            return
+        summary = ""
+        for channel, result in results.items():
+            if "error" in result:
+                summary += f"Channel {channel}: {result['error']}\n"
+            else:
+                worst = max(abs(error) for residual in result["residuals"] for error in residual)
+                summary += f"Channel {channel}: fitted in {result['fit_time']:.2f}s, worst residual {worst:.2f}°\n"
+        self.progress_label.setText("Status: Calibration complete.")
+        QMessageBox.information(self, "Calibrate All", summary or "No fixtures to calibrate.")
+
     def toggle_lock(self):
         """
         Toggles the lock state of the sensors, making them movable or fixed.
@@ -484,18 +545,10 @@ class SensorGUI(QtWidgets.QWidget):
 
                 clicked_coords = self.feet_inches_to_feet(feet_x, inches_x), self.feet_inches_to_feet(feet_y, inches_y)
 
-                # convert stage positions of sensors to feet and inches and then inches
-                sensor_positions = self.get_sensor_positions_stage()
-                sensor_positions = {
-                    sensor_id: (
-                        self.feet_inches_to_feet(*self.convert_to_feet_inches_stage(pos[0], pos[1])[:2]),
-                        self.feet_inches_to_feet(*self.convert_to_feet_inches_stage(pos[0], pos[1])[2:]),
-                    )
-                    for sensor_id, pos in sensor_positions.items()
-                }
-                stage_height = self.feet_inches_to_feet(self.stage_dimensions["height_feet"], self.stage_dimensions["height_inches"])
+                sensor_positions = self.get_sensor_positions_feet()
+                stage_height = self.get_stage_size_feet()[1]
                 if self.lock_sensors:
-                    self.eos.move_to_point(x=clicked_coords[0], y=clicked_coords[1], stage_max_y=stage_height, sensor_coords=sensor_positions, channel=self.active_channel)
+                    self.eos.move_to_point(x=clicked_coords[0], y=clicked_coords[1], stage_max_y=stage_height, sensor_coords=sensor_positions, channel=self.active_channel, servo=self.servo_checkbox.isChecked())
 
 
 
@@ -531,6 +584,36 @@ class SensorGUI(QtWidgets.QWidget):
                 sensor_positions[sensor_id] = (pos.x(), pos.y())
         return sensor_positions
 
+    def get_sensor_positions_feet(self):
+        """
+        Retrieves the positions of all sensors on stage in feet.
+        """
+        # convert stage positions of sensors to feet and inches and then inches
+        sensor_positions = self.get_sensor_positions_stage()
+        return {
+            sensor_id: (
+                self.feet_inches_to_feet(*self.convert_to_feet_inches_stage(pos[0], pos[1])[:2]),
+                self.feet_inches_to_feet(*self.convert_to_feet_inches_stage(pos[0], pos[1])[2:]),
+            )
+            for sensor_id, pos in sensor_positions.items()
+        }
+
+    def get_stage_size_feet(self):
+        """
+        Returns the stage (width, height) in feet.
+        """
+        width = self.feet_inches_to_feet(self.stage_dimensions["width_feet"], self.stage_dimensions["width_inches"])
+        height = self.feet_inches_to_feet(self.stage_dimensions["height_feet"], self.stage_dimensions["height_inches"])
+        return width, height
+
+    def track_point(self, x, y):
+        """
+        Points the active channel at a stage point (in feet) through its precomputed
+        lookup table, for live tracking sources that update at high rates.
+        """
+        stage_width, stage_height = self.get_stage_size_feet()
+        self.eos.track_point(x, y, stage_width, stage_height, self.get_sensor_positions_feet(), self.active_channel)
+
     def convert_to_feet_inches_stage(self, x, y):
         """
         Converts stage-relative coordinates to feet and inches based on the scale factor.
@@ -5,7 +5,7 @@ import time
 import logging
 import queue
 from collections import defaultdict
-from threading import Lock
+from threading import Condition, Lock
 
 from PyQt5 import QtCore, QtWidgets
 from PyQt5.QtCore import pyqtSignal, QObject
@@ -31,19 +31,31 @@ class LightControlApp:
         self.sensor_data = {1: 0.0, 2: 0.0, 3: 0.0, 4: 0.0}
         self.buffers = defaultdict(list)
         self.lock = Lock()
+        # Time (time.monotonic) of the oldest raw reading behind each sensor's current value,
+        # and a condition notified whenever sensor_data receives new values
+        self.sample_times = {}
+        # Mean time of the raw readings behind each value, to place sweep samples
+        self.reading_times = {}
+        self.buffer_times = defaultdict(list)
+        self.new_sample = Condition(self.lock)
         self.debounce_interval = debounce_interval
         self.debounce_enabled = debounce_enabled
         self.gui = None
 
         self.eos = EOS("192.168.1.100", 8000)
+        self.eos.attach_sensor_readings(self.sensor_data, self.lock, self.sample_times, self.new_sample)
         self.comm = Communicator()
         self.comm.update_label.connect(self.update_gui_label)
 
         # Queue for inter-thread communication
         self.progress_queue = queue.Queue()
 
-        # Initialize Navigator with sensor_data and lock
-        self.navigator = Navigator(eos=self.eos, sensor_data=self.sensor_data, gui=self.gui, lock=self.lock)
+        # Initialize Navigator with sensor_data and lock. A recalibration archives the
+        # calibration to .sensors_archive.json, and the scan then touches up around it;
+        # without an archive (the first calibration) it scans the full range.
+        self.navigator = Navigator(eos=self.eos, sensor_data=self.sensor_data, gui=self.gui, lock=self.lock,
+                                   touch_up=True, sample_times=self.sample_times, new_sample=self.new_sample,
+                                   reading_times=self.reading_times)
 
     def update_gui_label(self, message):
         if self.gui and hasattr(self.gui, 'progress_label'):
@@ -54,24 +66,43 @@ class LightControlApp:
     def add_sensor_reading(self, sensor_ID, intensity):
         sensor_ID = int(sensor_ID)
         intensity = float(intensity)
+        received = time.monotonic()
         with self.lock:
             if self.debounce_enabled:
+                self.buffer_times[sensor_ID].append(received)
                 self.buffers[sensor_ID].append(intensity)
                 logging.debug(f"Added intensity {intensity} to buffer for sensor {sensor_ID}")
             else:
                 self.sensor_data[sensor_ID] = intensity
+                self.sample_times[sensor_ID] = received
+                self.reading_times[sensor_ID] = received
+                self.new_sample.notify_all()
                 logging.debug(f"Set intensity {intensity} for sensor {sensor_ID}")
+        if not self.debounce_enabled:
+            self.eos.observe_sensor_reading(sensor_ID, intensity)
 
     def debounce_loop(self):
         while True:
+            debounced = {}
             with self.lock:
                 if self.debounce_enabled:
                     for sensor_ID, buffer in self.buffers.items():
                         if buffer:
                             avg_intensity = sum(buffer) / len(buffer)
                             self.sensor_data[sensor_ID] = avg_intensity
+                            # The average is only as fresh as its oldest reading, but
+                            # stands for the readings' mean time
+                            times = self.buffer_times.pop(sensor_ID)
+                            self.sample_times[sensor_ID] = times[0]
+                            self.reading_times[sensor_ID] = sum(times) / len(times)
+                            debounced[sensor_ID] = avg_intensity
                             logging.debug(f"Debounced sensor {sensor_ID}: {avg_intensity}")
                             self.buffers[sensor_ID] = []
+                    if debounced:
+                        self.new_sample.notify_all()
+            # Live readings refine the fixture models during the show
+            for sensor_ID, avg_intensity in debounced.items():
+                self.eos.observe_sensor_reading(sensor_ID, avg_intensity)
             time.sleep(self.debounce_interval)
 
     def navigator_loop(self):
@@ -79,7 +110,11 @@ class LightControlApp:
         logging.info("Navigator loop started.")
 
         while True:
-            if not self.eos.sensors_data_file_is_valid():
+            # An interrupted scan resumes even if some channels are already calibrated
+            if not self.eos.sensors_data_file_is_valid() or self.navigator.has_checkpoint():
+                if self.navigator.current_phase == Phase.COMPLETE:
+                    # Sensor data was removed by a recalibration after a finished scan
+                    self.navigator.current_phase = Phase.SETUP
                 # Execute Navigator with access to live sensor_data
                 navigator_state = self.navigator.execute()
                 logging.info(f"Navigator state: {navigator_state}")
@@ -145,6 +180,7 @@ class LightControlApp:
     def start(self):
         app = QtWidgets.QApplication(sys.argv)
         self.gui = SensorGUI(eos=self.eos)
+        self.navigator.gui = self.gui
         self.comm.update_label.connect(self.update_gui_label)
         self.gui.show()
 
@@ -0,0 +1,184 @@
+"""
+Micro-benchmarks for pan_tilt_predictor.py over synthetic rigs.
+
+Each rig is a random fixture (position, height) looking at random sensor
+positions on a stage. Observations are the exact pan/tilt to each sensor plus
+Gaussian noise, optionally with a few gross outliers, and pans are reported as
+a random equivalent within -270..270 (i.e. with a +/-360 offset where the
+fixture could reach it that way) as a real console would.
+
+For every (strategy, point count, noise level) it reports fit time, solver
+iterations and evaluations, success rate, light position error and prediction
+error on held-out stage points, plus single and batch prediction timings.
+
+Usage:
+    python benchmark_predictor.py --rigs 200 --points 4 8 16 --noise 0 0.5 2 --output results.json
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+from pan_tilt_predictor import PanTiltPredictor
+
+STRATEGIES = {
+    "linear": {},
+    "soft_l1": {"loss": "soft_l1"},
+    "ransac": {"outlier_rejection": True, "n_jobs": 1},
+}
+
+
+def make_rig(rng, n_points, noise, outliers, stage_width=30.0, stage_depth=20.0):
+    """
+    Generate one synthetic rig.
+
+    Returns:
+    - Tuple of (light position (Lx, Ly, h), list of (x, y, pan, tilt) observations).
+    """
+    light = (
+        rng.uniform(-5, stage_width + 5),
+        rng.uniform(-10, stage_depth + 5),
+        rng.uniform(8, 40),
+    )
+    x = rng.uniform(0, stage_width, n_points)
+    y = rng.uniform(0, stage_depth, n_points)
+    pan, tilt = PanTiltPredictor._compute_pan_tilt(*light, x, y)
+
+    pan = pan + rng.normal(0, noise, n_points)
+    tilt = tilt + rng.normal(0, noise, n_points)
+    bad = rng.choice(n_points, size=min(outliers, n_points), replace=False)
+    pan[bad] += rng.uniform(15, 60, len(bad)) * rng.choice([-1, 1], len(bad))
+    tilt[bad] += rng.uniform(-15, 15, len(bad))
+
+    # Report each pan as a random reachable equivalent in -270..270
+    pan = pan % 360
+    shifted = pan - 360
+    use_shifted = (shifted >= -270) & (rng.random(n_points) < 0.5)
+    pan = np.where(use_shifted | (pan > 270), shifted, pan)
+
+    return light, list(zip(x, y, pan, tilt))
+
+
+def prediction_error(predictor, light, rng, samples=200, stage_width=30.0, stage_depth=20.0):
+    """Max angular error in degrees of predict_pan_tilt over random stage points."""
+    x = rng.uniform(0, stage_width, samples)
+    y = rng.uniform(0, stage_depth, samples)
+    true_pan, true_tilt = PanTiltPredictor._compute_pan_tilt(*light, x, y)
+    pan, tilt = predictor.predict_pan_tilt_batch(x, y, return_original_format=False)
+    pan_error = (pan - true_pan + 180) % 360 - 180
+    return float(np.max(np.hypot(pan_error, tilt - true_tilt)))
+
+
+def benchmark_case(strategy, n_points, noise, outliers, rigs, seed, success_tolerance):
+    rng = np.random.default_rng(seed)
+    options = STRATEGIES[strategy]
+
+    fit_times, iterations, evaluations, position_errors, prediction_errors = [], [], [], [], []
+    failures = 0
+    for _ in range(rigs):
+        light, points = make_rig(rng, n_points, noise, outliers)
+        start = time.perf_counter()
+        try:
+            predictor = PanTiltPredictor(points, **options)
+        except (RuntimeError, ValueError):
+            failures += 1
+            continue
+        fit_times.append(time.perf_counter() - start)
+
+        result = predictor.optimization_result
+        iterations.append(result.nit)
+        evaluations.append(result.nfev)
+        position_error = float(np.linalg.norm(np.array(predictor.get_light_position()) - light))
+        position_errors.append(position_error)
+        if position_error > success_tolerance:
+            failures += 1
+        prediction_errors.append(prediction_error(predictor, light, rng))
+
+    def stats(values):
+        if not values:
+            return None
+        values = np.asarray(values, dtype=float)
+        return {
+            "mean": float(values.mean()),
+            "median": float(np.median(values)),
+            "p90": float(np.percentile(values, 90)),
+            "max": float(values.max()),
+        }
+
+    return {
+        "strategy": strategy,
+        "points": n_points,
+        "noise_deg": noise,
+        "outliers": outliers,
+        "rigs": rigs,
+        "success_rate": (rigs - failures) / rigs,
+        "fit_time_s": stats(fit_times),
+        "iterations": stats(iterations),
+        "function_evaluations": stats(evaluations),
+        "position_error_ft": stats(position_errors),
+        "prediction_error_deg": stats(prediction_errors),
+    }
+
+
+def benchmark_prediction(seed, repeats=2000, batch_size=10000):
+    """Per-point timing of predict_pan_tilt versus predict_pan_tilt_batch."""
+    rng = np.random.default_rng(seed)
+    _, points = make_rig(rng, 4, 0.0, 0)
+    predictor = PanTiltPredictor(points)
+    x = rng.uniform(0, 30, batch_size)
+    y = rng.uniform(0, 20, batch_size)
+
+    start = time.perf_counter()
+    for i in range(repeats):
+        predictor.predict_pan_tilt(x[i], y[i])
+    single = (time.perf_counter() - start) / repeats
+
+    start = time.perf_counter()
+    predictor.predict_pan_tilt_batch(x, y, pan_range=(-270, 270), tilt_range=(-115, 115))
+    batch = (time.perf_counter() - start) / batch_size
+
+    return {"predict_pan_tilt_s": single, "predict_pan_tilt_batch_per_point_s": batch}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark PanTiltPredictor on synthetic rigs.")
+    parser.add_argument("--rigs", type=int, default=100, help="Synthetic rigs per case.")
+    parser.add_argument("--points", type=int, nargs="+", default=[4, 8, 16], help="Reference point counts.")
+    parser.add_argument("--noise", type=float, nargs="+", default=[0.0, 0.5, 2.0], help="Observation noise in degrees.")
+    parser.add_argument("--outliers", type=int, default=0, help="Gross outliers per rig.")
+    parser.add_argument("--strategies", nargs="+", default=list(STRATEGIES), choices=list(STRATEGIES))
+    parser.add_argument("--success-tolerance", type=float, default=2.0, help="Max light position error in feet for a successful fit.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout.")
+    args = parser.parse_args(argv)
+
+    cases = []
+    for strategy in args.strategies:
+        for n_points in args.points:
+            # RANSAC needs more points than its sample size
+            if strategy == "ransac" and n_points <= 3:
+                continue
+            for noise in args.noise:
+                cases.append(benchmark_case(strategy, n_points, noise, args.outliers, args.rigs, args.seed, args.success_tolerance))
+
+    results = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "seed": args.seed,
+        "prediction": benchmark_prediction(args.seed),
+        "cases": cases,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+    else:
+        json.dump(results, sys.stdout, indent=4)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -107,7 +107,9 @@ class FixtureEditor(QMainWindow):
 
             if channel_item:
                 channel = channel_item.text().strip()
+                # Keep settings that aren't shown in the table, e.g. the motion model
                 new_data[channel] = {
+                    **self.data.get(channel, {}),
                     "max_tilt": int(safe_text(max_tilt_item)) if safe_text(max_tilt_item).lstrip('-').isdigit() else 0,
                     "min_tilt": int(safe_text(min_tilt_item)) if safe_text(min_tilt_item).lstrip('-').isdigit() else 0,
                     "max_pan": int(safe_text(max_pan_item)) if safe_text(max_pan_item).lstrip('-').isdigit() else 0,
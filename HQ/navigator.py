@@ -1,16 +1,24 @@
 from enum import Enum
 import json
+import os
 import numpy as np
+from scipy.linalg import hadamard
 from gevent import sleep
 import logging
+import time
 from collections import deque
 from threading import Lock
+from scan_history import ScanHistory, save_histories
+from pan_tilt_predictor import PanTiltPredictor
 
 logging.basicConfig(
     level=logging.DEBUG,
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+# (k0, k1, k2, k3) of the pan overshoot model, measured on one fixture/network combination
+DEFAULT_OVERSHOOT_MODEL = (0.0, 1.5728, -0.0187, 0.0000630)
+
 class Phase(Enum):
     SETUP = "setup"
     LOCATE = "locate"
@@ -18,18 +26,100 @@ class Phase(Enum):
     FAILED = "failed"
 
 class Navigator:
-    def __init__(self, eos=None, gui=None, sensor_data=None, lock=None):
+    def __init__(self, eos=None, gui=None, sensor_data=None, lock=None, scan_mode="raster", touch_up=False, sample_times=None, new_sample=None, clock=None, reading_times=None):
         self.gui = gui
         self.eos = eos
+        # Time source: gevent sleep and time.monotonic, or any object with sleep(seconds)
+        # and monotonic(), e.g. simulator.VirtualClock to run scans faster than real time
+        self.sleep = clock.sleep if clock is not None else sleep
+        self.monotonic = clock.monotonic if clock is not None else time.monotonic
         self.current_phase = Phase.SETUP
         self.pan = 0.0  # Current pan angle
         self.tilt = 0.0  # Current tilt angle
         self.best_intensity = -1
         self.sensor_data = sensor_data if sensor_data is not None else {}
         self.lock = lock if lock is not None else Lock()
+        # Per-sensor time (on the navigator's clock) of the oldest reading behind sensor_data, and a
+        # Condition on lock notified when sensor_data changes. Without them each step
+        # just waits step_delay.
+        self.sample_times = sample_times if sample_times is not None else {}
+        self.new_sample = new_sample
+        # Per-sensor mean time of the readings behind sensor_data (e.g. of a debounced
+        # average), where a sample's position is reconstructed from its time; if not
+        # given, sample_times are used
+        self.reading_times = reading_times if reading_times is not None else {}
         self.sensor_history = {}
 
+        # Scan settings
+        self.scan_mode = scan_mode  # "raster" (exhaustive raster at raster_step), "hierarchical" (coarse-to-fine), "sweep" (continuous pan rows), "adaptive" (step size follows the signal), "guided" (adaptive until a few sensors are found, then predicted from the stage plan), "multiplexed" (all fixtures at once, told apart by intensity codes) or "pipelined" (fixtures take turns being lit while the others move)
+        self.step_delay = 0.02  # Seconds to wait after each move before sampling (without sample notifications)
+        self.sample_timeout = 0.5  # Max seconds to wait for fresh samples after a move
+        self.sample_stale_after = 1.0  # Sensors silent for longer than this are not waited for
+        self.max_scan_tilt = 85
+        self.scan_steps = 0
+        # Hierarchical search
+        self.coarse_pan_step = 10
+        self.coarse_tilt_step = 5
+        self.fine_step = 1
+        self.refine_factor = 2.5  # Step size divisor between refinement levels
+        self.candidates_per_sensor = 2
+        # Touch-up recalibration around the archived calibration (.sensors_archive.json)
+        self.touch_up = touch_up
+        self.touch_up_window = 8  # Degrees searched either side of a sensor's last-known pan/tilt
+        self.touch_up_min_ratio = 3.0  # Peak-to-baseline ratio for a sensor to count as found
+        # Peak localization: degrees around the best sample used to fit the sub-step peak,
+        # widened to peak_fit_steps sample spacings either side for coarser scans
+        self.peak_fit_radius = 3
+        self.peak_fit_steps = 2
+        # Step in degrees of the raster, multiplexed and pipelined scans (pan and tilt)
+        self.raster_step = 1
+        # Overshoot model fitted per channel from forward vs. reverse peaks
+        self.fit_overshoot = True
+        self.max_overshoot = 30  # Max pan degrees between a sensor's forward and reverse peaks
+        self.overshoot_min_confidence = 0.5  # Min peak fit confidence in both directions
+        # Continuous sweep: one pan move per row, samples placed with the fixture's motion model
+        self.sweep_tilt_step = 1
+        self.sweep_settle = 0.1  # Extra seconds after a move before the next row starts
+        self.swept_channels = set()  # Channels whose sample pans are already corrected for motion
+        # Multiplexed scan
+        self.modulation_slot_delay = 0.1  # Seconds each intensity code slot is held; at least the sensors' sample period
+        self.multiplex_when_slower = False  # Multiplex even when scanning one fixture at a time looks faster
+
+        # Adaptive scan: strides grow up to the fixture's max_step while all sensors read
+        # ambient and drop to min_step when any sensor reads more than adaptive_ratio
+        # times its baseline or changes by more than (adaptive_ratio - 1) times it
+        self.adaptive_ratio = 1.5
+        # Guided search: sensors found by the adaptive scan before the rest are predicted
+        self.guided_min_sensors = 3
+        self.guided_window = 6  # Degrees searched either side of a predicted pan/tilt
+        # Zoom-assisted hierarchical search: wide beam for the coarse pass, narrow beam for
+        # refinement, for fixtures with zoom settings in .fixtures.json
+        self.zoom_assist = True
+        self.zoom_settle = 1.0  # Seconds for a zoom change
+        self.fit_since = {}  # channel -> first history row used for peak fitting
+
+        # Early termination: a full-range scan stops once every sensor is confidently located
+        self.early_stop = True
+        self.early_stop_min_ratio = 3.0  # Peak-to-baseline ratio
+        self.early_stop_falloff = 0.5  # Fraction of the peak above baseline the intensity must fall below...
+        self.early_stop_window = 10  # ...within this many degrees on each side of the peak in pan and tilt
+
+        # Settle-time model: each fixture's wait after a move of d degrees is
+        # settle_base + settle_per_degree * d, measured by a self-test in the setup phase
+        self.settle_self_test = True
+        self.self_test_moves = (5, 15, 45, 90)  # Degrees moved away from the test sensor
+        self.self_test_timeout = 3.0  # Seconds allowed for any response during the self-test
+        self.self_test_poll = 0.005  # Seconds between readings without sample notifications
+        self.self_test_settled = 0.97  # Fraction of the lit reading at which a move counts as settled
 
+        # Checkpointing: scan progress is saved at most every checkpoint_interval seconds
+        # so that a restart resumes the scan instead of starting over
+        self.checkpoint_file = ".scan_checkpoint.npz"
+        self.checkpoint_interval = 30.0
+        self.completed_channels = []
+        self.step_rows = {}  # channel -> history size after each scan step
+        self._replay = {}  # channel -> (checkpointed history, its step_rows) still to be replayed
+        self._last_checkpoint = self.monotonic()
 
         # Parameters for moving average filter
         self.history_length = 5  # Number of samples for moving average
@@ -76,6 +166,10 @@ class Navigator:
 
     def setup_phase(self):
         logging.info("Entering SETUP phase.")
+        if self.has_checkpoint():
+            logging.info("Found a scan checkpoint, resuming without setup.")
+            return Phase.LOCATE
+
         initial_pan, initial_tilt = 0, 0
         fixtures = self.eos.get_list_of_fixtures()
         for channel in fixtures:
@@ -83,7 +177,15 @@ class Navigator:
             self.eos.set_pan(channel, 0, initial_pan, use_degrees=True)
             self.eos.set_tilt(channel, 0, initial_tilt, use_degrees=True)
 
-        sleep(5)  # Wait for system to stabilize
+        # Wait for system to stabilize: long enough for the largest possible move
+        homing = [
+            self.settle_time(channel, np.ptp(self.eos.get_pan_range(channel)), np.ptp(self.eos.get_tilt_range(channel)))
+            for channel in fixtures
+        ]
+        self.sleep(max(homing, default=0))
+
+        if self.settle_self_test:
+            self.run_self_tests(fixtures)
 
         # Initialize best_intensity based on target sensor
 
@@ -96,104 +198,1172 @@ class Navigator:
         logging.info("Entering EXPLORE phase.")
 
         fixtures = self.eos.get_list_of_fixtures()
+        previous = self.eos.load_archived_sensor_data() if self.touch_up else {}
+        self.sensor_history = {}
+        self.swept_channels = set()
+        self.step_rows = {}
+        self.completed_channels = []
+        self.load_checkpoint()
+        # Touch-up searches fixture by fixture around the archived positions
+        if self.scan_mode == "multiplexed" and not previous and self.multiplexing_pays(fixtures):
+            self.multiplexed_scan([channel for channel in fixtures if channel not in self.completed_channels])
+            fixtures = []
+        elif self.scan_mode == "pipelined" and not previous:
+            self.pipelined_scan([channel for channel in fixtures if channel not in self.completed_channels])
+            fixtures = []
+
         for channel in fixtures:
+            if channel in self.completed_channels:
+                logging.info(f"Channel {channel} was scanned before the restart, skipping")
+                continue
             self.eos.set_intensity(channel, 100)
             # turn off all other fixtures
             for other_channel in fixtures:
                 if other_channel != channel:
                     self.eos.set_intensity(other_channel, 0)
-            self.sensor_history[channel] = {}
+            self.sensor_history[channel] = ScanHistory()
+            self.step_rows[channel] = []
+            self.fit_since.pop(channel, None)
+            # The fixture starts from home
+            self.pan, self.tilt = 0.0, 0.0
+
+            self.scan_steps = 0
+            if self.touch_up and previous.get(channel):
+                self.touch_up_scan(channel, previous[channel])
+            else:
+                self.wide_scan(channel)
+
+            logging.info(f"End of scan for channel {channel} after {self.scan_steps} steps")
+            self.eos.set_intensity(channel, 0)
+            self.eos.set_pan(channel, 0, 0, use_degrees=True)
+            self.eos.set_tilt(channel, 0, 0, use_degrees=True)
+
+            self.calculate(channel)
+            self.complete_channel(channel)
+            self.save_checkpoint()
+
+        save_histories("sensor_history.npz", self.sensor_history)
+        self.clear_checkpoint()
+
+        self.calibrate_all()
+
+        return Phase.COMPLETE
+
+    def wide_scan(self, channel):
+        """
+        Searches the fixture's whole pan/tilt range with the configured scan mode.
+        """
+        if self.scan_mode == "hierarchical":
+            self.hierarchical_scan(channel)
+        elif self.scan_mode == "sweep":
+            self.sweep_scan(channel)
+        elif self.scan_mode == "adaptive":
+            self.adaptive_scan(channel)
+        elif self.scan_mode == "guided":
+            self.guided_scan(channel)
+        else:
+            self.raster_scan(channel)
+
+    def touch_up_scan(self, channel, previous):
+        """
+        Recalibrates a fixture from its previous calibration: a small local raster
+        around each sensor's last-known pan/tilt, falling back to a wide search only
+        if some sensor is not confidently found within its window.
+        """
+        max_tilt = min(self.eos.get_tilt_range(channel)[1], self.max_scan_tilt)
+        min_pan, max_pan = self.eos.get_pan_range(channel)
+        window = self.touch_up_window
+
+        missing = []
+        for sensor_id, record in previous.items():
+            sensor_id = int(sensor_id)
+            tilt = record["tilt"]
+            pan = self.estimate_raw_pan(record["pan"], tilt, record.get("direction", 1), channel)
+            self.raster(
+                channel,
+                max(min_pan, pan - window), min(max_pan, pan + window),
+                max(0, tilt - window), min(max_tilt, tilt + window),
+                self.fine_step, self.fine_step,
+            )
+            if not self.is_located(channel, sensor_id, pan, tilt, window):
+                missing.append(sensor_id)
+
+        if missing:
+            logging.info(f"Sensors {missing} not found near their previous positions. Falling back to a wide search.")
+            self.wide_scan(channel)
+        else:
+            logging.info(f"Touch-up of channel {channel} found all sensors in {self.scan_steps} steps")
+
+    def guided_scan(self, channel):
+        """
+        Finds the first guided_min_sensors sensors with an adaptive scan, fits a
+        provisional fixture pose to them and the sensors' stage positions from the GUI,
+        and then searches only a small window around the predicted pan/tilt of each
+        remaining sensor. The scan pans are corrected with an overshoot model fitted
+        to the sensors found so far (see fit_overshoot_model), as a stored or default
+        model may not fit this fixture. If a sensor is not confidently found in its
+        window, the adaptive scan continues from where it stopped. Without enough
+        sensor positions the whole range is scanned adaptively.
+        """
+        positions = {}
+        if self.gui:
+            # In the stage frame the predictors work in (see EOS.get_reference_points)
+            stage_height = self.gui.get_stage_size_feet()[1]
+            positions = {str(sensor_id): (x, self.eos.invert_y(y, stage_height)) for sensor_id, (x, y) in self.gui.get_sensor_positions_feet().items()}
+        if len(positions) <= self.guided_min_sensors:
+            logging.info("Not enough sensor positions for a guided search. Scanning the whole range.")
+            self.adaptive_scan(channel)
+            return
+
+        resume = self.adaptive_scan(channel, stop_after=self.guided_min_sensors)
+        history = self.sensor_history[channel]
+        located = [str(sensor_id) for sensor_id in self.located_sensors(channel) if str(sensor_id) in positions]
+        remaining = [sensor_id for sensor_id in history.sensor_ids if str(sensor_id) in positions and str(sensor_id) not in located]
+        if resume is None or len(located) < 2 or not remaining:
+            return
+
+        # Until a sensor was seen in both directions, no overshoot is corrected
+        if self.fit_overshoot:
+            model = self.fit_overshoot_model(channel) or (0.0, 0.0, 0.0, 0.0)
+        else:
+            model = self.get_overshoot_model(channel)
+        points = []
+        for sensor_id in history.sensor_ids:
+            if str(sensor_id) in located:
+                peak = history.fit_peak(sensor_id, radius=self.peak_fit_radius, min_steps=self.peak_fit_steps)
+                pan = self.predict_corrected_pan_nonlinear(peak["pan"], peak["tilt"], peak["direction"], model=model)
+                points.append((*positions[str(sensor_id)], pan, peak["tilt"]))
+        try:
+            predictor = PanTiltPredictor(points)
+        except (RuntimeError, ValueError) as e:
+            logging.warning(f"Provisional fit of channel {channel} failed: {e}. Continuing the adaptive scan.")
+            self.adaptive_scan(channel, resume=resume)
+            return
+
+        max_tilt = min(self.eos.get_tilt_range(channel)[1], self.max_scan_tilt)
+        min_pan, max_pan = self.eos.get_pan_range(channel)
+        window = self.guided_window
+
+        missing = []
+        for sensor_id in remaining:
+            x, y = positions[str(sensor_id)]
+            pans, tilts = predictor.predict_pan_tilt_batch(
+                [x], [y], pan_range=(min_pan, max_pan), tilt_range=(0, max_tilt),
+                current_pan=self.pan, current_tilt=self.tilt,
+            )
+            if np.isnan(pans[0]):
+                missing.append(sensor_id)
+                continue
+            tilt = float(tilts[0])
+            pan = self.estimate_raw_pan(float(pans[0]), tilt, 1, model=model)
+            logging.info(f"Sensor {sensor_id} predicted at pan {pan:.1f}, tilt {tilt:.1f}")
+            self.raster(
+                channel,
+                max(min_pan, pan - window), min(max_pan, pan + window),
+                max(0, tilt - window), min(max_tilt, tilt + window),
+                self.fine_step, self.fine_step,
+            )
+            if not self.is_located(channel, sensor_id, pan, tilt, window):
+                missing.append(sensor_id)
+
+        if missing:
+            logging.info(f"Sensors {missing} not found near their predicted positions. Continuing the adaptive scan.")
+            self.adaptive_scan(channel, resume=resume)
+        else:
+            logging.info(f"Guided search of channel {channel} found all sensors in {self.scan_steps} steps")
+
+    def estimate_raw_pan(self, corrected_pan, tilt, direction, channel=None, model=None):
+        """
+        Inverts predict_corrected_pan_nonlinear: the scan pan at which a sensor with
+        the given calibrated pan was recorded.
+        """
+        raw_pan = corrected_pan
+        for _ in range(3):
+            raw_pan = corrected_pan + (raw_pan - self.predict_corrected_pan_nonlinear(raw_pan, tilt, direction, channel, model))
+        return raw_pan
+
+    def is_located(self, channel, sensor_id, pan, tilt, window):
+        """
+        Whether a sensor's peak inside the window around pan/tilt stands clearly above
+        the window's baseline (touch_up_min_ratio) and lies inside the window rather
+        than on its edge, where the true peak could be outside.
+        """
+        history = self.sensor_history[channel]
+        if sensor_id not in history:
+            return False
+        pans, tilts, _, intensities = history.window(sensor_id, pan, tilt, window, window)
+        if len(intensities) == 0:
+            return False
+
+        best = int(np.argmax(intensities))
+        baseline = max(np.percentile(intensities, 10), 1e-9)
+        on_edge = abs(pans[best] - pan) >= window or abs(tilts[best] - tilt) >= window
+        return intensities[best] / baseline >= self.touch_up_min_ratio and not on_edge
+
+    def raster_scan(self, channel):
+        """
+        Exhaustive serpentine raster over the whole pan range at raster_step degree
+        steps, one row per raster_step degrees of tilt up to max_scan_tilt.
+        """
+        max_tilt = min(self.eos.get_tilt_range(channel)[1], self.max_scan_tilt)
+        min_pan, max_pan = self.eos.get_pan_range(channel)
+        pan_move_step = self.raster_step
+        tilt_move_step = self.raster_step
+
+        self.raster(channel, min_pan, max_pan, 0, max_tilt, pan_move_step, tilt_move_step, stop_when_located=self.early_stop)
+
+    def hierarchical_scan(self, channel):
+        """
+        Coarse-to-fine search: a raster of the whole range at coarse steps finds
+        candidate regions for each sensor, then successively finer local rasters
+        are run only around the best candidates until the step reaches fine_step.
+        """
+        max_tilt = min(self.eos.get_tilt_range(channel)[1], self.max_scan_tilt)
+        min_pan, max_pan = self.eos.get_pan_range(channel)
+        coarse_pan_step, coarse_tilt_step = self.coarse_pan_step, self.coarse_tilt_step
+
+        # A wider beam hits the sensors from further away, so the coarse steps grow with it
+        zoom = self.eos.get_zoom_settings(channel) if self.zoom_assist else None
+        if zoom:
+            parameter, wide, narrow = zoom
+            coarse_pan_step *= wide / narrow
+            coarse_tilt_step *= wide / narrow
+            self.set_zoom(channel, parameter, wide)
+
+        self.raster(channel, min_pan, max_pan, 0, max_tilt, coarse_pan_step, coarse_tilt_step, stop_when_located=self.early_stop)
+
+        if zoom:
+            self.set_zoom(channel, parameter, narrow)
+            # Peaks are fitted to the narrow-beam samples only
+            self.fit_since[channel] = len(self.sensor_history[channel])
+
+        for sensor_id in list(self.sensor_history[channel].sensor_ids):
+            candidates = self.find_candidates(channel, sensor_id, self.candidates_per_sensor, min(coarse_pan_step, coarse_tilt_step) * 2)
+            logging.info(f"Sensor {sensor_id} coarse candidates (pan, tilt): {candidates}")
+            for pan, tilt in candidates:
+                pan_step, tilt_step = coarse_pan_step, coarse_tilt_step
+                if zoom:
+                    # The wide beam covers several coarse samples, so their centroid locates
+                    # the sensor well enough to start refining at the usual coarse steps
+                    pan, tilt = self.centroid_near(channel, sensor_id, pan, tilt, coarse_pan_step, coarse_tilt_step)
+                    pan_step, tilt_step = self.coarse_pan_step, self.coarse_tilt_step
+                while pan_step > self.fine_step or tilt_step > self.fine_step:
+                    # Search one coarse step either side of the best point so far at a finer step
+                    window_pan, window_tilt = pan_step, tilt_step
+                    pan_step = max(self.fine_step, pan_step / self.refine_factor)
+                    tilt_step = max(self.fine_step, tilt_step / self.refine_factor)
+                    self.raster(
+                        channel,
+                        max(min_pan, pan - window_pan), min(max_pan, pan + window_pan),
+                        max(0, tilt - window_tilt), min(max_tilt, tilt + window_tilt),
+                        pan_step, tilt_step,
+                    )
+                    pan, tilt = self.best_sample_near(channel, sensor_id, pan, tilt, window_pan, window_tilt)
+
+    def set_zoom(self, channel, parameter, value):
+        """
+        Sets the fixture's beam parameter (e.g. zoom or iris) and waits for it to settle.
+        """
+        logging.info(f"Setting {parameter} of channel {channel} to {value}")
+        self.eos.set_parameter(channel, parameter, value)
+        self.sleep(self.zoom_settle)
+
+    def sweep_scan(self, channel):
+        """
+        Continuous serpentine scan of the whole range: each tilt row is a single pan
+        move from one end of the range to the other, sampled while the fixture travels.
+        The samples' pans come from the motion model, so calculate applies no
+        overshoot correction to them.
+        """
+        self.swept_channels.add(channel)
+        max_tilt = min(self.eos.get_tilt_range(channel)[1], self.max_scan_tilt)
+        min_pan, max_pan = self.eos.get_pan_range(channel)
+        tilts = np.append(np.arange(0, max_tilt, self.sweep_tilt_step), max_tilt)
+
+        direction = 1
+        for scan_tilt in tilts:
+            start, end = (min_pan, max_pan) if direction == 1 else (max_pan, min_pan)
+            self.sweep(channel, start, end, float(scan_tilt), direction)
+            direction = -direction
+            if self.early_stop and self.all_sensors_located(channel):
+                logging.info(f"All sensors located, ending the sweep of channel {channel} at tilt {scan_tilt}")
+                break
+
+    def adaptive_scan(self, channel, stop_after=None, resume=None):
+        """
+        Serpentine scan of the whole range with adaptive strides in pan and tilt (see
+        adaptive_row). Rows advance by up to max_step degrees of tilt while no sensor
+        responds; when a row responds after a long tilt stride, the skipped rows are
+        scanned before continuing at min_step. If stop_after is given, the scan also
+        ends once that many sensors are confidently located.
+
+        Parameters:
+        - resume: The state returned by an earlier scan that stopped, to continue it
+            from the next row instead of starting at tilt 0.
+
+        Returns:
+        - The (tilt, direction, tilt_step, previous_tilt) of the next row, to pass as
+          resume, or None if the scan reached the top of the range.
+        """
+        max_tilt = min(self.eos.get_tilt_range(channel)[1], self.max_scan_tilt)
+        min_pan, max_pan = self.eos.get_pan_range(channel)
+        min_step, max_step = self.eos.get_scan_steps(channel)
+
+        tilt, direction, tilt_step, previous_tilt = resume or (0.0, 1, min_step, None)
+        while True:
+            rows = [tilt]
+            active = self.adaptive_row(channel, min_pan, max_pan, tilt, direction, min_step, max_step)
+            if active and previous_tilt is not None and tilt - previous_tilt > min_step:
+                rows = list(np.arange(previous_tilt + min_step, tilt, min_step)) + [tilt]
+                for fill_tilt in rows[:-1]:
+                    direction = -direction
+                    self.adaptive_row(channel, min_pan, max_pan, float(fill_tilt), direction, min_step, max_step)
+            tilt_step = min_step if active else min(tilt_step * 2, max_step)
+            direction = -direction
+
+            if tilt >= max_tilt:
+                return None
+            if self.early_stop and self.all_sensors_located(channel):
+                logging.info(f"All sensors located, ending the adaptive scan of channel {channel} at tilt {tilt}")
+                break
+            if stop_after is not None and len(self.located_sensors(channel)) >= stop_after:
+                logging.info(f"{stop_after} sensors located, ending the adaptive scan of channel {channel} at tilt {tilt}")
+                break
+            previous_tilt, tilt = tilt, min(tilt + tilt_step, max_tilt)
+        return min(tilt + tilt_step, max_tilt), direction, tilt_step, tilt
+
+    def adaptive_row(self, channel, min_pan, max_pan, tilt, direction, min_step, max_step):
+        """
+        Scans one pan row with adaptive strides. The stride doubles after every step at
+        which all sensors read ambient light (up to max_step) and drops to min_step as
+        soon as any sensor responds (see is_responding). A response after a long stride
+        means the stride may have skipped the rising edge, so it is filled in at min_step.
+        The baseline is each sensor's median over the channel's scan so far.
+
+        Returns:
+        - bool: True if any sensor responded anywhere in the row.
+        """
+        history = self.sensor_history[channel]
+        baseline = np.nanmedian(history.intensities, axis=0) if len(history) else np.empty(0)
+        start, end = (min_pan, max_pan) if direction == 1 else (max_pan, min_pan)
+
+        pan, step = float(start), min_step
+        last_pan, previous = None, None
+        row_active = False
+        while True:
+            self.visit(channel, pan, tilt, direction)
+            latest = history.intensities[-1].astype(float)
+            active = self.is_responding(latest, previous, baseline)
+
+            if active and last_pan is not None and abs(pan - last_pan) > min_step:
+                for fill_pan in np.arange(last_pan + direction * min_step, pan, direction * min_step):
+                    self.visit(channel, float(fill_pan), tilt, direction)
+                self.visit(channel, pan, tilt, direction)
+                latest = history.intensities[-1].astype(float)
+
+            row_active |= active
+            step = min_step if active else min(step * 2, max_step)
+            if pan == end:
+                return row_active
+            last_pan, previous = pan, latest
+            pan = min(pan + step, end) if direction == 1 else max(pan - step, end)
+
+    def is_responding(self, latest, previous, baseline):
+        """
+        Whether any sensor's latest reading is more than adaptive_ratio times its baseline,
+        or changed by more than (adaptive_ratio - 1) times its baseline since the previous
+        step. Sensors without a baseline yet use their latest reading.
+        """
+        baseline = np.concatenate([baseline, latest[len(baseline):]])
+        baseline = np.maximum(np.where(np.isnan(baseline), latest, baseline), 1e-9)
+        with np.errstate(invalid="ignore"):
+            if np.any(latest > self.adaptive_ratio * baseline):
+                return True
+            if previous is not None:
+                previous = np.concatenate([previous, latest[len(previous):]])
+                return bool(np.any(np.abs(latest - previous) > (self.adaptive_ratio - 1) * baseline))
+        return False
+
+    def sweep(self, channel, start_pan, end_pan, tilt, direction):
+        """
+        Moves the fixture to (start_pan, tilt), then commands end_pan in one move and
+        records sensor samples until the fixture has arrived. The pan of each sample is
+        reconstructed from its timestamp with the fixture's motion model (see
+        sweep_position), so samples don't wait for the fixture to stop.
+        """
+        if self.replay_step([channel], moves=2):
+            self.pan, self.tilt = end_pan, tilt
+            return
+
+        pan_speed, tilt_speed, latency = self.eos.get_motion_model(channel)
+
+        # Get into position for the row
+        travel = max(abs(start_pan - self.pan) / pan_speed, abs(tilt - self.tilt) / tilt_speed)
+        self.eos.set_pan(channel, 0, start_pan, use_degrees=True)
+        self.eos.set_tilt(channel, 0, tilt, use_degrees=True)
+        self.scan_steps += 1
+        self.sleep(latency + travel + self.sweep_settle)
+
+        command_time = self.monotonic()
+        self.eos.set_pan(channel, 0, end_pan, use_degrees=True)
+        self.scan_steps += 1
+        self.pan, self.tilt = end_pan, tilt
+        end_time = command_time + latency + abs(end_pan - start_pan) / pan_speed
+
+        last_sample = {}
+        while True:
+            self.wait_for_samples(self.step_delay)
+            now = self.monotonic()
+            readings, sample_times, reading_times = self.get_timed_samples()
+
+            # Group fresh readings by when they were taken; without timestamps a reading
+            # is taken now. Only readings all taken after the command are used (by their
+            # sample time), and their pan is that of their mean reading time.
+            samples = {}
+            for sensor_id, intensity in readings.items():
+                sample_time = sample_times.get(sensor_id, now)
+                if sample_time < command_time or sample_time <= last_sample.get(sensor_id, -np.inf):
+                    continue
+                last_sample[sensor_id] = sample_time
+                samples.setdefault(reading_times.get(sensor_id, sample_time), {})[sensor_id] = intensity
+
+            for reading_time, sample in sorted(samples.items()):
+                pan = self.sweep_position(start_pan, end_pan, reading_time - command_time, pan_speed, latency)
+                self.record_step(channel, sample, pan, tilt, direction)
 
-            # Move the light in a spiral pattern
-            max_tilt = self.eos.get_tilt_range(channel)[1]
+            if now >= end_time:
+                break
+
+        self.end_step([channel])
+
+    @staticmethod
+    def sweep_position(start_pan, end_pan, elapsed, pan_speed, latency):
+        """
+        Pan of a fixture elapsed seconds after it was commanded from start_pan to
+        end_pan: it starts after latency, travels at a constant pan_speed (degrees per
+        second) and stops at end_pan.
+        """
+        travelled = min(abs(end_pan - start_pan), pan_speed * max(0.0, elapsed - latency))
+        return start_pan + np.sign(end_pan - start_pan) * travelled
+
+    def raster(self, channel, min_pan, max_pan, min_tilt, max_tilt, pan_step, tilt_step, stop_when_located=False):
+        """
+        Visits a pan/tilt rectangle in serpentine rows (pan sweeps alternate direction,
+        tilt advances by tilt_step per row), recording every sensor at every step.
+        With stop_when_located, the raster ends after the first row at which every
+        sensor is confidently located (see all_sensors_located).
+        """
+        row_tilt = None
+        for scan_pan, scan_tilt, direction in self.raster_positions(min_pan, max_pan, min_tilt, max_tilt, pan_step, tilt_step):
+            if stop_when_located and scan_tilt != row_tilt:
+                if row_tilt is not None and self.all_sensors_located(channel):
+                    logging.info(f"All sensors located, ending the raster of channel {channel} at tilt {row_tilt}")
+                    return
+                row_tilt = scan_tilt
+            self.visit(channel, scan_pan, scan_tilt, direction)
+
+    def all_sensors_located(self, channel):
+        """
+        Whether every sensor that has reported is confidently located (see
+        is_confidently_located) in the channel's scan so far.
+        """
+        history = self.sensor_history[channel]
+        return bool(history.sensor_ids) and len(self.located_sensors(channel)) == len(history.sensor_ids)
+
+    def located_sensors(self, channel):
+        """
+        The sensors confidently located (see is_confidently_located) in the channel's scan so far.
+        """
+        history = self.sensor_history[channel]
+        peaks = history.peaks()
+        return [
+            sensor_id for sensor_id in history.sensor_ids
+            if sensor_id in peaks and self.is_confidently_located(history, sensor_id, peaks[sensor_id])
+        ]
+
+    def is_confidently_located(self, history, sensor_id, peak):
+        """
+        A sensor is confidently located when its peak is at least early_stop_min_ratio
+        times its baseline (median intensity), the intensity falls off from the peak
+        on all four sides (below, above, left and right) within early_stop_window,
+        and the scan has gone as far past the peak's tilt as the peak fit reaches
+        (see ScanHistory.fit_peak) so the fit has samples on both sides.
+        """
+        intensity = history.intensity(sensor_id)
+        baseline = max(float(np.nanmedian(intensity)), 1e-9)
+        if peak["intensity"] / baseline < self.early_stop_min_ratio:
+            return False
+        spacing = history.sample_spacing(peak["pan"], peak["tilt"], peak["direction"])
+        if np.max(history.tilt) < peak["tilt"] + max(self.peak_fit_radius, self.peak_fit_steps * spacing):
+            return False
+
+        dimmed = intensity < baseline + self.early_stop_falloff * (peak["intensity"] - baseline)
+        # Pans 360° apart are the same direction, so a peak at one end of the pan range
+        # can fall off on the far side at the other end
+        pan_offset = (history.pan - peak["pan"] + 180) % 360 - 180
+        near_pan = np.abs(pan_offset) <= self.early_stop_window
+        near_tilt = np.abs(history.tilt - peak["tilt"]) <= self.early_stop_window
+        same_row = history.tilt == peak["tilt"]
+        sides = (
+            near_pan & near_tilt & (history.tilt < peak["tilt"]),
+            near_pan & near_tilt & (history.tilt > peak["tilt"]),
+            same_row & near_pan & (pan_offset < 0),
+            same_row & near_pan & (pan_offset > 0),
+        )
+        return all(np.any(side & dimmed) for side in sides)
+
+    @staticmethod
+    def raster_positions(min_pan, max_pan, min_tilt, max_tilt, pan_step, tilt_step):
+        """
+        Yields the (pan, tilt, direction) positions of a serpentine raster.
+        """
+        pans = np.append(np.arange(min_pan, max_pan, pan_step), max_pan)
+        tilts = np.append(np.arange(min_tilt, max_tilt, tilt_step), max_tilt)
+        direction = 1
+        for scan_tilt in tilts:
+            row = pans if direction == 1 else pans[::-1]
+            for scan_pan in row:
+                yield float(scan_pan), float(scan_tilt), direction
+            direction = -direction
+
+    def multiplexed_scan(self, fixtures):
+        """
+        Scans all fixtures at once. Every fixture follows its own raster (see raster_scan), and at
+        each step the fixtures' intensities are keyed with mutually orthogonal Walsh
+        codes over a few short slots. Correlating each sensor's readings with a
+        fixture's code (lock-in style) recovers that fixture's contribution and
+        cancels ambient light and the other fixtures, so each reading is attributed
+        to its channel. Moves and settling happen once per step for the whole rig,
+        and the slots follow each other back to back (see modulate), so a step costs
+        the slowest settle plus a sample period and the light latency uncertainty per
+        slot. That only beats scanning the fixtures one at a time with short sample
+        periods (see multiplexing_pays). A fixture's scan stops early once all its
+        sensors are located (see all_sensors_located).
+        """
+        codes = self.walsh_codes(len(fixtures))
+        logging.info(f"Multiplexed scan of {len(fixtures)} fixtures with {codes.shape[1]} slots per step")
+
+        paths, positions, previous = {}, {}, {}
+        for channel in fixtures:
+            self.sensor_history[channel] = ScanHistory()
+            self.step_rows[channel] = []
+            self.fit_since.pop(channel, None)
+            self.eos.set_intensity(channel, 0)
+            max_tilt = min(self.eos.get_tilt_range(channel)[1], self.max_scan_tilt)
             min_pan, max_pan = self.eos.get_pan_range(channel)
-            pan_move_step = 1
-            tilt_move_step = 1
-
-            self.send_light_command(min_pan, 0, use_degrees=True, channel=channel)
-
-
-            scan_pan = min_pan
-            scan_tilt = 0
-            direction = 1
-            max_scan_tilt = 85
-            while True:
-                # set tilt
-                for i in range(0, max_pan, pan_move_step):
-                    self.eos.set_pan(channel,0,scan_pan, use_degrees=True)
-                    self.eos.set_tilt(channel,0,scan_tilt, use_degrees=True)
-                    self.pan = scan_pan
-                    self.tilt = scan_tilt
-                    sleep(0.02)
-
-                    # get the intensity data for each sensor and store it in history with the pan/tilt values
-                    sensor_data = self.get_new_data()
-                    for sensor_id, intensity in sensor_data.items():
-                        if sensor_id not in self.sensor_history[channel]:
-                            self.sensor_history[channel][sensor_id] = []
-                        # self.sensor_history[sensor_id].append({"intensity": intensity, "pan": scan_pan, "tilt": scan_tilt, "direction": direction})
-                        self.sensor_history[channel][sensor_id].append({"intensity": intensity, "pan": scan_pan, "tilt": scan_tilt, "direction": direction})
-
-                    scan_pan += pan_move_step * direction
-
-
-                if direction == 1 and scan_pan >= max_pan:
-                    direction = -1
-                    scan_pan = max_pan
-                    scan_tilt += tilt_move_step
-                    if scan_tilt > max_tilt:
-                        break
-                elif direction == -1 and scan_pan <= min_pan:
-                    direction = 1
-                    scan_pan = min_pan
-                    scan_tilt += tilt_move_step
-                    if scan_tilt > max_tilt:
-                        break
-                if (abs(scan_tilt) > max_scan_tilt):
-                    logging.info("End of scan")
+            paths[channel] = self.raster_positions(min_pan, max_pan, 0, max_tilt, self.raster_step, self.raster_step)
+            positions[channel] = next(paths[channel])
+            previous[channel] = (0.0, 0.0)
+
+        self.scan_steps = 0
+        while positions:
+            channels = list(positions)
+            if not self.replay_step(channels):
+                settle = 0.0
+                for channel in channels:
+                    pan, tilt, _ = positions[channel]
+                    self.eos.set_pan(channel, 0, pan, use_degrees=True)
+                    self.eos.set_tilt(channel, 0, tilt, use_degrees=True)
+                    distance = (abs(pan - previous[channel][0]), abs(tilt - previous[channel][1]))
+                    settle = max(settle, self.settle_time(channel, *distance))
+                self.pan, self.tilt = positions[channels[0]][:2]
+                self.scan_steps += 1
+                readings = self.modulate(fixtures, channels, codes, self.monotonic() + settle)
+
+                # Each fixture's contribution, plus the ambient light left over, is what
+                # the sensor would read with only that fixture lit, as in a raster scan
+                decoded = {channel: {} for channel in channels}
+                for sensor_id in readings[0]:
+                    if not all(sensor_id in reading for reading in readings):
+                        continue
+                    samples = np.array([reading[sensor_id] for reading in readings])
+                    amplitudes = 2 * (codes @ samples) / len(readings)
+                    ambient = samples.mean() - sum(amplitudes[fixtures.index(channel)] for channel in channels) / 2
+                    for channel in channels:
+                        decoded[channel][sensor_id] = float(amplitudes[fixtures.index(channel)] + ambient)
+                for channel in channels:
+                    pan, tilt, direction = positions[channel]
+                    self.record_step(channel, decoded[channel], pan, tilt, direction)
+                self.end_step(channels)
+
+            for channel in channels:
+                pan, tilt, _ = positions[channel]
+                previous[channel] = (pan, tilt)
+                position = next(paths[channel], None)
+                if position is not None and position[1] != tilt and self.early_stop and self.all_sensors_located(channel):
+                    logging.info(f"All sensors located, ending the scan of channel {channel} at tilt {tilt}")
+                    position = None
+                if position is None:
+                    del positions[channel]
+                    logging.info(f"End of multiplexed scan for channel {channel}")
                     self.eos.set_intensity(channel, 0)
-                    # TODO don't hardcode the channel here
                     self.eos.set_pan(channel, 0, 0, use_degrees=True)
                     self.eos.set_tilt(channel, 0, 0, use_degrees=True)
-                    break
+                    self.calculate(channel)
+                    self.complete_channel(channel)
+                else:
+                    positions[channel] = position
 
-            self.calculate(channel)
+    def multiplexing_pays(self, fixtures):
+        """
+        Whether a multiplexed scan of fixtures is estimated to be faster than scanning
+        them one at a time, or multiplex_when_slower is set. A raster step settles
+        every fixture once either way. One at a time, each fixture is then sampled,
+        on average half a sample period later. Multiplexed, every code slot is held
+        modulation_slot_delay plus the light latency uncertainty (see modulate),
+        apart from the first slot's latency, which overlaps the settle. At the app's
+        0.1 s sample period the slots cost more than the settles they save, and
+        unless multiplex_when_slower is set the fixtures are scanned one at a time.
+        """
+        settles = [self.settle_time(channel, self.raster_step, 0) for channel in fixtures]
+        earliest, latest = self.light_latency_bounds(fixtures)
+        slots = self.walsh_codes(len(fixtures)).shape[1]
+        multiplexed = max(settles) + slots * (self.modulation_slot_delay + latest - earliest) - latest
+        sequential = sum(settle + self.modulation_slot_delay / 2 for settle in settles)
+        if multiplexed < sequential or self.multiplex_when_slower:
+            return True
+        logging.warning(
+            f"A multiplexed scan step would take about {multiplexed:.2f}s, against {sequential:.2f}s for "
+            f"scanning the {len(fixtures)} fixtures one at a time, so they are scanned one at a time. "
+            "Multiplexing needs a shorter sample period (modulation_slot_delay) or measured light latencies (see self_test)."
+        )
+        return False
+
+    def light_latency_bounds(self, channels):
+        """
+        The earliest and latest seconds after an intensity command at which the light
+        of any of the channels may change. The latency is only known to within a
+        sample period if it was measured (see self_test), or to be at most the
+        fixture's command latency if not.
+        """
+        earliest, latest = [], []
+        for channel in channels:
+            model = self.eos.get_settle_model(channel)
+            if model is not None:
+                # Measured at the sensors' sample rate, so up to a sample period late
+                earliest.append(max(0.0, model["light_latency"] - self.modulation_slot_delay))
+                latest.append(model["light_latency"])
+            else:
+                earliest.append(0.0)
+                latest.append(self.eos.get_motion_model(channel)[2])
+        return min(earliest), max(latest)
 
+    def modulate(self, fixtures, channels, codes, ready):
+        """
+        Keys the intensities of channels with their rows of codes (indexed like
+        fixtures) and returns the readings taken under each slot. Slots are not
+        waited out one by one: the next slot is sent while the previous one's light
+        is still on, and every reading is assigned to a slot by its timestamp,
+        allowing for the light latency. As that is only known within bounds (see
+        light_latency_bounds), slots are held modulation_slot_delay plus the
+        uncertainty, and readings are taken only once a slot's light is
+        surely on and before the next slot's may be. The first slot is sent so that
+        its light comes on as the fixtures settle at ready, and readings from before
+        then are ignored.
 
+        Returns:
+        - list: Dict of sensor_id -> reading per slot. Sensors without a reading in
+            a slot are missing from it.
+        """
+        earliest, latest = self.light_latency_bounds(channels)
+        slots = codes.shape[1]
+        readings = [{} for _ in range(slots)]
+        sends = []
+        self.sleep(max(0.0, ready - latest - self.monotonic()))
+        for slot in range(slots + 1):
+            if slot < slots:
+                if sends:
+                    self.sleep(max(0.0, sends[-1] + self.modulation_slot_delay + latest - earliest - self.monotonic()))
+                for channel in channels:
+                    self.eos.set_intensity(channel, 100 if codes[fixtures.index(channel), slot] > 0 else 0)
+                sends.append(self.monotonic())
+            if slot == 0:
+                continue
+            self.wait_for_samples(0, since=sends[slot - 1] + latest)
+            values, sample_times = self.get_new_samples()
+            now = self.monotonic()
+            for sensor_id, value in values.items():
+                taken = sample_times.get(sensor_id, now)
+                window = int(np.searchsorted(np.array(sends) + earliest, taken, side="right")) - 1
+                if taken >= ready and window >= 0 and taken >= sends[window] + latest:
+                    readings[window][sensor_id] = value
+        return readings
 
-        with open("sensor_history.json", "w") as f:
-            json.dump(self.sensor_history, f)
+    def pipelined_scan(self, fixtures):
+        """
+        Scans several fixtures at once by time-slicing: each fixture follows its own
+        raster (see raster_scan), and the fixtures take turns being lit on their own.
+        While one fixture is lit and sampled, the others are moving to their next
+        position and settling, so only the sampling windows are serialized and all
+        readings in a window belong to the lit fixture. A fixture is lit once its move
+        has settled (see pipeline_move) and sampled once its light has come on.
 
+        A sampling window can't be shorter than the light latency plus a sample period,
+        since the light latency is only measured to within one. At a 0.1 s sample
+        period that is about as long as a raster step of a fixture on its own (a short
+        settle rounded up to the next sample), so two fixtures gain nothing and the
+        speedup only comes with three or more fixtures or faster sensors.
+        """
+        logging.info(f"Pipelined scan of {len(fixtures)} fixtures")
+        paths, positions, ready = {}, {}, {}
+        for channel in fixtures:
+            self.sensor_history[channel] = ScanHistory()
+            self.step_rows[channel] = []
+            self.fit_since.pop(channel, None)
+            self.eos.set_intensity(channel, 0)
+            max_tilt = min(self.eos.get_tilt_range(channel)[1], self.max_scan_tilt)
+            min_pan, max_pan = self.eos.get_pan_range(channel)
+            paths[channel] = self.raster_positions(min_pan, max_pan, 0, max_tilt, self.raster_step, self.raster_step)
+            positions[channel] = next(paths[channel])
+            ready[channel] = self.pipeline_move(channel, positions[channel], (0.0, 0.0))
 
-        return Phase.COMPLETE
+        self.scan_steps = 0
+        while positions:
+            for channel in list(positions):
+                pan, tilt, direction = positions[channel]
+                if not self.replay_step([channel]):
+                    self.sleep(max(0.0, ready[channel] - self.monotonic()))
+                    self.eos.set_intensity(channel, 100)
+                    # Without a measured light latency, the command latency bounds it
+                    model = self.eos.get_settle_model(channel)
+                    light_latency = model["light_latency"] if model is not None else self.eos.get_motion_model(channel)[2]
+                    self.wait_for_samples(0, since=self.monotonic() + light_latency)
+                    readings = self.get_new_data()
+                    self.eos.set_intensity(channel, 0)
+                    self.scan_steps += 1
+                    self.record_step(channel, readings, pan, tilt, direction)
+                    self.end_step([channel])
+
+                position = next(paths[channel], None)
+                if position is not None and position[1] != tilt and self.early_stop and self.all_sensors_located(channel):
+                    logging.info(f"All sensors located, ending the scan of channel {channel} at tilt {tilt}")
+                    position = None
+                if position is None:
+                    del positions[channel]
+                    logging.info(f"End of pipelined scan for channel {channel}")
+                    self.eos.set_pan(channel, 0, 0, use_degrees=True)
+                    self.eos.set_tilt(channel, 0, 0, use_degrees=True)
+                    self.calculate(channel)
+                    self.complete_channel(channel)
+                    continue
+                ready[channel] = self.pipeline_move(channel, position, positions[channel])
+                positions[channel] = position
+
+    def pipeline_move(self, channel, position, previous):
+        """
+        Commands a fixture's next scan position, unless that step will be replayed from a
+        checkpoint. Returns the time at which the fixture will have settled after the
+        move from previous (see settle_time).
+        """
+        if channel not in self._replay:
+            self.eos.set_pan(channel, 0, position[0], use_degrees=True)
+            self.eos.set_tilt(channel, 0, position[1], use_degrees=True)
+        self.pan, self.tilt = position[0], position[1]
+        settle = self.settle_time(channel, abs(position[0] - previous[0]), abs(position[1] - previous[1]))
+        return self.monotonic() + settle
+
+    @staticmethod
+    def walsh_codes(count):
+        """
+        Returns count zero-mean, mutually orthogonal +1/-1 codes: rows of the
+        smallest Hadamard matrix with more than count rows, skipping the constant row.
+        """
+        length = 2
+        while length <= count:
+            length *= 2
+        return hadamard(length)[1:count + 1]
+
+    def visit(self, channel, pan, tilt, direction):
+        """
+        Moves the fixture to pan/tilt, waits for it to settle and records the
+        intensity of every sensor with the position and sweep direction.
+        """
+        if self.replay_step([channel]):
+            self.pan, self.tilt = pan, tilt
+            return
+
+        settle = self.settle_time(channel, abs(pan - self.pan), abs(tilt - self.tilt))
+        self.eos.set_pan(channel, 0, pan, use_degrees=True)
+        self.eos.set_tilt(channel, 0, tilt, use_degrees=True)
+        self.pan = pan
+        self.tilt = tilt
+        self.scan_steps += 1
+        self.wait_then_sample(settle, self.step_delay)
+
+        # get the intensity data for each sensor and store it in history with the pan/tilt values
+        sensor_data = self.get_new_data()
+        self.record_step(channel, sensor_data, pan, tilt, direction)
+        self.end_step([channel])
+
+    def wait_then_sample(self, delay, fallback):
+        """
+        Waits for samples taken at least delay seconds (a settle time or latency) from
+        now. The first such sample is used rather than one after it: a measured delay
+        already runs to the first sample that showed the fixture settled (see
+        self_test), so waiting out the delay and then for another fresh sample would
+        count the sample period twice. If delay is None (nothing measured), just waits
+        for fresh samples, or for fallback seconds without sample notifications (see
+        wait_for_samples).
+        """
+        if delay is None:
+            self.wait_for_samples(fallback)
+            return
+        self.wait_for_samples(0, since=self.monotonic() + delay)
+
+    def settle_time(self, channel, pan_distance, tilt_distance):
+        """
+        Seconds for the fixture to arrive and settle after a move of pan_distance and
+        tilt_distance degrees: from its measured settle model (on the longer axis), or
+        if it hasn't been measured, its latency plus the travel time of the slower
+        axis from its motion model (see EOS.get_motion_model).
+        """
+        model = self.eos.get_settle_model(channel)
+        if model is not None:
+            return model["settle_base"] + model["settle_per_degree"] * max(pan_distance, tilt_distance)
+        pan_speed, tilt_speed, latency = self.eos.get_motion_model(channel)
+        return latency + max(pan_distance / pan_speed, tilt_distance / tilt_speed)
+
+    def run_self_tests(self, fixtures):
+        """
+        Measures the settle model of every fixture with a previous calibration (see
+        self_test), on its most confidently calibrated sensor, and stores it with the
+        fixture data. Fixtures without a previous calibration keep their stored model,
+        or the fixed delays if they have none.
+        """
+        archive = self.eos.load_archived_sensor_data()
+        for channel in fixtures:
+            records = archive.get(channel)
+            if not records:
+                logging.info(f"No previous calibration of channel {channel} to self-test against.")
+                continue
+            sensor_id, record = max(records.items(), key=lambda item: item[1].get("confidence", 0))
+            model = self.self_test(channel, sensor_id, record["pan"], record["tilt"])
+            if model is not None:
+                logging.info(f"Channel {channel} settle model: {model}")
+                self.eos.set_settle_model(channel, model)
+            self.eos.set_intensity(channel, 0)
+            self.eos.set_pan(channel, 0, 0, use_degrees=True)
+            self.eos.set_tilt(channel, 0, 0, use_degrees=True)
+            self.sleep(self.self_test_timeout)
+
+    def self_test(self, channel, sensor_id, pan, tilt):
+        """
+        Measures a fixture's timing on a sensor at a known pan/tilt:
+        - light latency: from the intensity command until the sensor reads half its
+          lit level, with the fixture already aimed at it;
+        - settle time: from the command back onto the sensor, after moving each of
+          self_test_moves degrees away, until it reads self_test_settled of its lit level.
+        The settle times are fitted as settle_base + settle_per_degree * distance.
+
+        Returns:
+        - Dict with "light_latency", "settle_base" and "settle_per_degree" in seconds,
+          or None if the sensor isn't lit at pan/tilt or too few moves could be timed.
+        """
+        min_pan, max_pan = self.eos.get_pan_range(channel)
+        timeout = self.self_test_timeout
+
+        self.eos.set_intensity(channel, 0)
+        self.eos.set_pan(channel, 0, pan, use_degrees=True)
+        self.eos.set_tilt(channel, 0, tilt, use_degrees=True)
+        self.sleep(timeout)
+        dark = self.sensor_reading(sensor_id)
+        self.eos.set_intensity(channel, 100)
+        self.sleep(timeout)
+        lit = self.sensor_reading(sensor_id)
+        if dark is None or lit is None or lit < self.touch_up_min_ratio * max(dark, 1e-9):
+            logging.warning(f"Sensor {sensor_id} is not lit by channel {channel} at its previous position. Skipping the self-test.")
+            return None
+
+        self.eos.set_intensity(channel, 0)
+        self.sleep(timeout)
+        start = self.monotonic()
+        self.eos.set_intensity(channel, 100)
+        latency = self.wait_for_reading(sensor_id, dark + 0.5 * (lit - dark), start, timeout)
+
+        settled = dark + self.self_test_settled * (lit - dark)
+        distances, settle_times = [], []
+        for distance in self.self_test_moves:
+            away = pan + distance if pan + distance <= max_pan else pan - distance
+            self.eos.set_pan(channel, 0, away, use_degrees=True)
+            self.sleep(timeout)
+            reading = self.sensor_reading(sensor_id)
+            if reading is None or reading >= settled:
+                continue  # The beam still covers the sensor
+            start = self.monotonic()
+            self.eos.set_pan(channel, 0, pan, use_degrees=True)
+            settle = self.wait_for_reading(sensor_id, settled, start, timeout)
+            if settle is not None:
+                distances.append(distance)
+                settle_times.append(settle)
+        self.eos.set_intensity(channel, 0)
+
+        if len(set(distances)) < 2:
+            logging.warning(f"Too few moves of channel {channel} could be timed for a settle model.")
+            return None
+        per_degree, base = np.polyfit(distances, settle_times, 1)
+        return {
+            "light_latency": latency if latency is not None else float(base),
+            "settle_base": max(float(base), 0.0),
+            "settle_per_degree": max(float(per_degree), 0.0),
+        }
+
+    def sensor_reading(self, sensor_id):
+        """The current reading of a sensor (sensor ids compared as strings), or None."""
+        readings = self.get_new_data()
+        return next((value for key, value in readings.items() if str(key) == str(sensor_id)), None)
+
+    def wait_for_reading(self, sensor_id, threshold, since, timeout):
+        """
+        Polls a sensor until a sample taken after since reaches threshold.
+
+        Returns:
+        - Seconds from since to that sample, or None after timeout seconds.
+        """
+        while self.monotonic() - since < timeout:
+            self.wait_for_samples(self.self_test_poll)
+            now = self.monotonic()
+            readings, sample_times = self.get_new_samples()
+            for key, value in readings.items():
+                if str(key) == str(sensor_id):
+                    sample_time = sample_times.get(key, now)
+                    if sample_time >= since and value >= threshold:
+                        return sample_time - since
+        return None
+
+    def wait_for_samples(self, delay, since=None):
+        """
+        Waits until every live sensor has a value made only of readings taken at or
+        after since (by default, this call), so the next get_new_data() reflects the
+        command just sent. Gives up sample_timeout after since. Without sample
+        notifications it sleeps for delay, or until since if that is later.
+        """
+        command_time = self.monotonic()
+        if since is None:
+            since = command_time
+        if self.new_sample is None:
+            self.sleep(max(delay, since - command_time))
+            return
+
+        with self.new_sample:
+            live = [sensor_id for sensor_id, sample_time in self.sample_times.items()
+                    if command_time - sample_time <= self.sample_stale_after]
+            taken = lambda: all(self.sample_times[sensor_id] >= since for sensor_id in live)
+            # Readings taken at the instant of a command don't reflect it, so only
+            # samples from before this call are accepted without waiting
+            fresh = since < command_time and taken()
+            if not fresh:
+                fresh = self.new_sample.wait_for(taken, timeout=max(0.0, since - command_time) + self.sample_timeout)
+        if not fresh:
+            logging.debug(f"No fresh samples from every sensor within {self.sample_timeout}s")
+
+    def record_step(self, channel, readings, pan, tilt, direction):
+        self.sensor_history[channel].append(pan, tilt, direction, readings)
+
+    def end_step(self, channels):
+        """
+        Marks the end of a scan step of the given channels, and checkpoints the scan
+        if checkpoint_interval has passed since the last checkpoint.
+        """
+        for channel in channels:
+            self.step_rows[channel].append(len(self.sensor_history[channel]))
+        if self.monotonic() - self._last_checkpoint >= self.checkpoint_interval:
+            self.save_checkpoint()
+
+    def replay_step(self, channels, moves=1):
+        """
+        When resuming from a checkpoint, copies the samples of the next scan step of the
+        given channels from the checkpoint instead of scanning it again. Steps are
+        replayed in their original order, so scans that choose where to look from the
+        samples so far (hierarchical, touch-up) take the same decisions as before.
+
+        Returns:
+        - bool: True if the step was replayed, False if it still has to be scanned.
+        """
+        if not all(channel in self._replay for channel in channels):
+            return False
+
+        for channel in channels:
+            source, source_rows = self._replay[channel]
+            step = len(self.step_rows[channel])
+            start = source_rows[step - 1] if step > 0 else 0
+            for row in range(start, source_rows[step]):
+                self.sensor_history[channel].append(*source.row(row))
+            self.step_rows[channel].append(len(self.sensor_history[channel]))
+            if len(self.step_rows[channel]) == len(source_rows):
+                logging.info(f"Resumed channel {channel} after {len(source_rows)} checkpointed steps")
+                del self._replay[channel]
+        self.scan_steps += moves
+        return True
+
+    def has_checkpoint(self):
+        return os.path.exists(self.checkpoint_file)
+
+    def save_checkpoint(self):
+        """
+        Saves the scan histories, the steps taken in each and the scan progress to
+        checkpoint_file. The file is written next to it and then renamed over it, so
+        a crash while saving leaves the previous checkpoint intact.
+        """
+        arrays = {}
+        for channel, history in self.sensor_history.items():
+            arrays.update(history.to_arrays(prefix=f"{channel}/"))
+            arrays[f"{channel}/step_rows"] = np.array(self.step_rows.get(channel, []), dtype=np.int64)
+        history = self.sensor_history.get(self.current_channel())
+        cursor = {
+            "scan_mode": self.scan_mode,
+            "touch_up": self.touch_up,
+            "completed_channels": self.completed_channels,
+            "channel": self.current_channel(),
+            "steps": self.scan_steps,
+            "row": float(history.tilt[-1]) if history else None,
+            "direction": int(history.direction[-1]) if history else None,
+        }
+        arrays["cursor"] = np.array(json.dumps(cursor))
+
+        temp_file = self.checkpoint_file + ".tmp.npz"
+        np.savez_compressed(temp_file, **arrays)
+        os.replace(temp_file, self.checkpoint_file)
+        self._last_checkpoint = self.monotonic()
+        logging.debug(f"Scan checkpoint saved: {cursor}")
+
+    def complete_channel(self, channel):
+        """Marks a channel's scan as done, so a resumed scan skips it."""
+        if channel not in self.completed_channels:
+            self.completed_channels.append(channel)
+
+    def current_channel(self):
+        """The channel being scanned: the last one in sensor_history that isn't complete."""
+        remaining = [channel for channel in self.sensor_history if channel not in self.completed_channels]
+        return remaining[-1] if remaining else None
+
+    def load_checkpoint(self):
+        """
+        Restores a scan interrupted by a restart from checkpoint_file: completed channels
+        keep their histories and are skipped, the channel in progress is replayed up to
+        the checkpoint (see replay_step) and then scanned as usual.
+
+        Returns:
+        - The checkpoint's progress dict, or None if there is no usable checkpoint.
+        """
+        self._replay = {}
+        if not self.has_checkpoint():
+            return None
+        try:
+            with np.load(self.checkpoint_file) as data:
+                arrays = {key: data[key] for key in data.files}
+            cursor = json.loads(str(arrays.pop("cursor")))
+        except (OSError, ValueError, KeyError) as e:
+            logging.error(f"Ignoring unreadable scan checkpoint: {e}")
+            return None
+        if cursor["scan_mode"] != self.scan_mode or cursor["touch_up"] != self.touch_up:
+            logging.warning("Ignoring scan checkpoint made with a different scan mode.")
+            return None
+
+        self.completed_channels = cursor["completed_channels"]
+        for channel in {key.split("/", 1)[0] for key in arrays}:
+            history = ScanHistory.from_arrays(arrays, prefix=f"{channel}/")
+            step_rows = arrays[f"{channel}/step_rows"].tolist()
+            if channel in self.completed_channels:
+                self.sensor_history[channel] = history
+                self.step_rows[channel] = step_rows
+            elif step_rows:
+                self._replay[channel] = (history, step_rows)
+        logging.info(f"Resuming scan from checkpoint: {cursor}")
+        return cursor
+
+    def clear_checkpoint(self):
+        if self.has_checkpoint():
+            os.remove(self.checkpoint_file)
+
+    def find_candidates(self, channel, sensor_id, count, separation):
+        """
+        Returns up to count (pan, tilt) positions with the highest intensity for a
+        sensor, each at least separation degrees away from the ones before it.
+        """
+        history = self.sensor_history[channel]
+        intensity = np.nan_to_num(history.intensity(sensor_id), nan=-np.inf)
+        candidates = []
+        for index in np.argsort(-intensity, kind="stable"):
+            pan, tilt = float(history.pan[index]), float(history.tilt[index])
+            if all(max(abs(pan - other_pan), abs(tilt - other_tilt)) >= separation for other_pan, other_tilt in candidates):
+                candidates.append((pan, tilt))
+                if len(candidates) == count:
+                    break
+        return candidates
+
+    def centroid_near(self, channel, sensor_id, pan, tilt, pan_window, tilt_window):
+        """
+        Returns the intensity-weighted mean (pan, tilt) of a sensor's samples above half
+        the maximum within the given window around pan/tilt, weighted by their intensity
+        above the sensor's baseline. Falls back to pan/tilt if no sample is above baseline.
+        """
+        history = self.sensor_history[channel]
+        pans, tilts, _, intensities = history.window(sensor_id, pan, tilt, pan_window, tilt_window)
+        weights = intensities - np.nanmedian(history.intensity(sensor_id))
+        if len(weights) == 0 or weights.max() <= 0:
+            return pan, tilt
+        weights = np.where(weights >= weights.max() / 2, weights, 0)
+        return float(np.average(pans, weights=weights)), float(np.average(tilts, weights=weights))
+
+    def best_sample_near(self, channel, sensor_id, pan, tilt, pan_window, tilt_window):
+        """
+        Returns the (pan, tilt) of the highest intensity sample for a sensor within
+        the given window around pan/tilt.
+        """
+        pans, tilts, _, intensities = self.sensor_history[channel].window(sensor_id, pan, tilt, pan_window, tilt_window)
+        best = int(np.argmax(intensities))
+        return float(pans[best]), float(tilts[best])
+
+    def calibrate_all(self):
+        """
+        Fits every fixture's pan/tilt model in parallel once the scan is done, so
+        the first GUI click per channel doesn't have to.
+        """
+        if not self.gui:
+            logging.info("No GUI attached. Fixtures will be calibrated on first use.")
+            return
+
+        try:
+            stage_height = self.gui.get_stage_size_feet()[1]
+            results = self.eos.calibrate_all(self.gui.get_sensor_positions_feet(), stage_height)
+        except Exception as e:
+            logging.error(f"Failed to calibrate fixtures: {e}")
+            return
+
+        for channel, result in results.items():
+            logging.info(f"Channel {channel} calibration: {result}")
 
     def calculate(self, channel):
         """
         Looks through the entire history of sensor data and calculates the
-        pan/tilt values that correspond to the highest intensity for each sensor.
+        pan/tilt values that correspond to the highest intensity for each sensor,
+        refined below the scan step by a local surface fit around the maximum.
         """
         logging.info("Entering CALCULATE phase.")
-        for sensor_id, history in self.sensor_history[channel].items():
-            max_intensity = -1
-            best_pan = 0
-            best_tilt = 0
-            best_direction = 1
-            for record in history:
-                intensity = record["intensity"]
-                pan = record["pan"]
-                tilt = record["tilt"]
-                if intensity > max_intensity:
-                    max_intensity = intensity
-                    best_pan = pan
-                    best_tilt = tilt
-                    best_direction = record["direction"]
-            logging.info(f"Sensor {sensor_id} max intensity: {max_intensity} at pan: {best_pan}, tilt: {best_tilt}")
-            corrected_pan = self.predict_corrected_pan_nonlinear(best_pan, best_tilt, best_direction)
-            self.eos.set_sensor_data(sensor_id, corrected_pan, best_tilt, best_direction, channel)
+        history = self.sensor_history[channel]
+        # Swept samples are placed where the fixture was, so they have no overshoot
+        swept = channel in self.swept_channels
+        if self.fit_overshoot and not swept:
+            coefficients = self.fit_overshoot_model(channel)
+            if coefficients is not None:
+                logging.info(f"Channel {channel} overshoot model (k0, k1, k2, k3): {coefficients}")
+                self.eos.set_overshoot_model(channel, coefficients)
+
+        for sensor_id in history.sensor_ids:
+            peak = history.fit_peak(sensor_id, radius=self.peak_fit_radius, min_steps=self.peak_fit_steps, since=self.fit_since.get(channel, 0))
+            if peak is None:
+                continue
+            max_intensity = peak["intensity"]
+            best_pan = peak["pan"]
+            best_tilt = peak["tilt"]
+            best_direction = peak["direction"]
+            logging.info(f"Sensor {sensor_id} max intensity: {max_intensity} at pan: {best_pan}, tilt: {best_tilt} (confidence {peak['confidence']:.2f})")
+            corrected_pan = best_pan if swept else self.predict_corrected_pan_nonlinear(best_pan, best_tilt, best_direction, channel)
+            self.eos.set_sensor_data(sensor_id, corrected_pan, best_tilt, best_direction, channel, confidence=peak["confidence"])
 
         logging.info("Calculated best pan/tilt for each sensor.")
 
-        for sensor_id in self.sensor_history[channel]:
+        for sensor_id in self.sensor_history[channel].sensor_ids:
             logging.info(f"Sensor {sensor_id}: {self.eos.get_sensor_data(sensor_id, channel)}")
 
 
@@ -204,6 +1374,21 @@ class Navigator:
 
         return new_data
 
+    def get_new_samples(self):
+        """
+        Returns copies of sensor_data and of the sample timestamps, taken together.
+        """
+        with self.lock:
+            return self.sensor_data.copy(), dict(self.sample_times)
+
+    def get_timed_samples(self):
+        """
+        Like get_new_samples, plus the mean reading times (see reading_times), which
+        fall back to the sample times where not given.
+        """
+        with self.lock:
+            return self.sensor_data.copy(), dict(self.sample_times), {**self.sample_times, **self.reading_times}
+
     def execute(self):
         """
         Executes the current phase and transitions to the next phase.
@@ -229,7 +1414,7 @@ class Navigator:
         """
         return np.sqrt((pos1[0] - pos2[0])**2 + (pos1[1] - pos2[1])**2)
 
-    def predict_corrected_pan_nonlinear(self, actual_pan, tilt, direction):
+    def predict_corrected_pan_nonlinear(self, actual_pan, tilt, direction, channel=None, model=None):
         """
         Predict the corrected pan value using the refined nonlinear model.
 
@@ -237,15 +1422,75 @@ class Navigator:
         - actual_pan (float): The actual pan value.
         - tilt (float): The tilt value.
         - direction (int): The direction of motion (1 for forward, -1 for backward).
+        - channel: If given, use the channel's fitted overshoot coefficients
+            instead of the defaults.
+        - model: If given, the (k0, k1, k2, k3) coefficients to use instead.
 
         Returns:
         - float: The predicted corrected pan value.
         """
-        k1 = 1.5728
-        k2 = -0.0187
-        k3 = 0.0000630
+        k0, k1, k2, k3 = model if model is not None else self.get_overshoot_model(channel)
 
         # Compute the predicted corrected pan
-        overshoot_adjustment = (k1 * tilt + k2 * tilt**2 + k3 * tilt * actual_pan) * direction
+        overshoot_adjustment = (k0 + k1 * tilt + k2 * tilt**2 + k3 * tilt * actual_pan) * direction
         corrected_pan = actual_pan - overshoot_adjustment
         return corrected_pan
+
+    def get_overshoot_model(self, channel=None):
+        """
+        Returns the (k0, k1, k2, k3) overshoot coefficients for a channel: the ones
+        fitted from its scans if available, otherwise DEFAULT_OVERSHOOT_MODEL.
+        """
+        if channel is not None:
+            coefficients = self.eos.get_overshoot_model(channel)
+            if coefficients is not None:
+                return tuple(coefficients)
+        return DEFAULT_OVERSHOOT_MODEL
+
+    def fit_overshoot_model(self, channel):
+        """
+        Estimates the channel's overshoot coefficients from the sensors it found in
+        both sweep directions.
+
+        For a sensor seen at pan p_f sweeping forward and p_r sweeping backward at
+        tilt t, the model gives p_f - p_r = 2 * (k0 + k1*t + k2*t² + k3*t*p). The
+        coefficients are solved by least squares over the sensors. With too few
+        sensors (or too little spread in tilt) only the leading terms are fitted and
+        the rest are zero: latency alone (k0) for one or two sensors, k0 and k1 for up
+        to seven. Each term needs two sensors so a single bad peak can't be matched exactly.
+
+        Returns:
+        - (k0, k1, k2, k3), or None if no sensor was seen in both directions.
+        """
+        history = self.sensor_history[channel]
+        rows = []
+        for sensor_id in history.sensor_ids:
+            since = self.fit_since.get(channel, 0)
+            forward = history.fit_peak(sensor_id, radius=self.peak_fit_radius, min_steps=self.peak_fit_steps, direction=1, since=since)
+            backward = history.fit_peak(sensor_id, radius=self.peak_fit_radius, min_steps=self.peak_fit_steps, direction=-1, since=since)
+            if forward is None or backward is None:
+                continue
+            # Only sub-step peaks are precise enough to measure the lag
+            if min(forward["confidence"], backward["confidence"]) < self.overshoot_min_confidence:
+                continue
+            # The two peaks may be on pan branches 360 degrees apart
+            offset = (forward["pan"] - backward["pan"] + 180) % 360 - 180
+            # Both peaks must be the same hit, not e.g. a reflection
+            if abs(offset) > self.max_overshoot or abs(forward["tilt"] - backward["tilt"]) > 2 * self.fine_step:
+                continue
+            tilt = (forward["tilt"] + backward["tilt"]) / 2
+            pan = backward["pan"] + offset / 2
+            rows.append((1.0, tilt, tilt**2, tilt * pan, offset / 2))
+
+        if not rows:
+            return None
+
+        rows = np.array(rows)
+        for terms in (4, 2, 1):
+            if len(rows) < 2 * terms and terms > 1:
+                continue
+            features = rows[:, :terms]
+            coefficients, _, rank, _ = np.linalg.lstsq(features, rows[:, 4], rcond=None)
+            if rank == terms:
+                return tuple(float(k) for k in np.append(coefficients, np.zeros(4 - terms)))
+        return None
@@ -1,28 +1,98 @@
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 from scipy.optimize import minimize
 
+LOSSES = ("linear", "soft_l1", "huber", "cauchy")
+
+
+def _solve_candidate(args):
+    """
+    Process pool worker: fit the light position to one subset of reference points.
+    Returns the (Lx, Ly, h) solution, or None if the solve failed.
+    """
+    points, loss, loss_scale = args
+    try:
+        result = PanTiltPredictor._solve(points, loss, loss_scale)
+    except (RuntimeError, ValueError):
+        return None
+    return tuple(result.x) if result.success else None
+
+
+def fit_predictor(reference_points, options=None):
+    """
+    Process pool worker: fit a PanTiltPredictor to a channel's reference points.
+
+    Returns:
+    - Tuple of (predictor, fit time in seconds).
+    """
+    start = time.perf_counter()
+    predictor = PanTiltPredictor(reference_points, **(options or {}))
+    return predictor, time.perf_counter() - start
+
+
 class PanTiltPredictor:
-    def __init__(self, four_points):
+    def __init__(self, reference_points, loss="linear", loss_scale=1.0, outlier_rejection=False,
+                 inlier_threshold=3.0, sample_size=3, max_trials=200, n_jobs=None, random_state=None):
         """
-        Initialize the predictor with four reference points.
+        Initialize the predictor with two or more reference points.
 
         Parameters:
-        - four_points: List of four tuples, each containing:
+        - reference_points: List of tuples, each containing:
             (x_i, y_i, pan_i, tilt_i)
             where:
                 x_i, y_i: Coordinates of the point on stage in feet (float)
                 pan_i: Pan angle in degrees (-270 to 270)
                 tilt_i: Tilt angle in degrees (0-90)
+        - loss: Per-point loss applied to the squared pan/tilt error, one of
+            "linear" (plain least squares), "soft_l1", "huber" or "cauchy".
+        - loss_scale: Error (in degrees) at which the robust losses start to
+            down-weight a point.
+        - outlier_rejection: If True, fit RANSAC-style: solve every subset of
+            sample_size points (or max_trials random subsets), keep the candidate
+            that agrees with the most points, and refit on its inliers. The subset
+            solves run in a process pool with n_jobs workers (all cores if None,
+            serially if 1).
+        - inlier_threshold: Max angular error in degrees for a point to count as
+            an inlier during outlier rejection.
+        - random_state: Seed for subset sampling when there are more than
+            max_trials subsets.
         """
-        if len(four_points) != 4:
-            raise ValueError("Exactly four reference points are required.")
+        if len(reference_points) < 2:
+            raise ValueError("At least two reference points are required.")
+        if loss not in LOSSES:
+            raise ValueError(f"Unknown loss '{loss}'. Expected one of {LOSSES}.")
+        if outlier_rejection and len(reference_points) <= sample_size:
+            raise ValueError(f"Outlier rejection needs more than {sample_size} reference points.")
 
         # Map all pan_i to 0-360 for internal consistency
-        self.four_points = [
+        self.reference_points = [
             (x, y, self._map_to_0_360(pan_i), tilt_i)
-            for (x, y, pan_i, tilt_i) in four_points
+            for (x, y, pan_i, tilt_i) in reference_points
         ]
-        self.light_position = self._find_light_position()
+        self.loss = loss
+        self.loss_scale = loss_scale
+        self.inlier_threshold = inlier_threshold
+        self.sample_size = sample_size
+        self.max_trials = max_trials
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+
+        # Online refinement state, see add_observation
+        self.calibration_size = len(self.reference_points)
+        self.max_observations = 50
+        self.observation_errors = []
+        self.drift = None
+
+        self.inlier_mask = np.ones(len(self.reference_points), dtype=bool)
+        if outlier_rejection:
+            self.light_position = self._find_light_position_ransac()
+        else:
+            self.light_position = self._find_light_position()
 
     @staticmethod
     def _map_to_0_360(angle):
@@ -59,67 +129,162 @@ class PanTiltPredictor:
 
         return pan, tilt
 
-    def _find_light_position(self):
+    @staticmethod
+    def _robust_loss(squared_error, loss, loss_scale):
         """
-        Determine the light's position (Lx, Ly, h) using the four reference points.
+        Apply a robust loss to per-point squared errors.
 
         Returns:
-        - Tuple containing (Lx, Ly, h) in feet.
+        - Tuple of (rho, drho) arrays: the loss value and its derivative with
+          respect to the squared error.
+        """
+        c2 = loss_scale**2
+        if loss == "linear":
+            return squared_error, np.ones_like(squared_error)
+        if loss == "soft_l1":
+            root = np.sqrt(1 + squared_error / c2)
+            return 2 * c2 * (root - 1), 1 / root
+        if loss == "huber":
+            root = np.sqrt(np.maximum(squared_error, 1e-12))
+            inside = squared_error <= c2
+            rho = np.where(inside, squared_error, 2 * loss_scale * root - c2)
+            return rho, np.where(inside, 1.0, loss_scale / root)
+        if loss == "cauchy":
+            return c2 * np.log1p(squared_error / c2), 1 / (1 + squared_error / c2)
+        raise ValueError(f"Unknown loss '{loss}'.")
+
+    @staticmethod
+    def _error_and_gradient(params, points, loss="linear", loss_scale=1.0):
+        """
+        Total (robust) pan/tilt error over all reference points and its exact
+        gradient with respect to (Lx, Ly, h), computed in one vectorized pass.
+
+        The pan error of a point is the squared distance between the observed and
+        computed pan unit vectors, 2 - 2cos(pan_calc - pan_obs); the tilt error is
+        the squared difference in degrees. The per-point sum of the two is passed
+        through the robust loss.
+        """
+        Lx, Ly, h = params
+        dx = points[:, 0] - Lx
+        dy = points[:, 1] - Ly
+        r2 = np.maximum(dx**2 + dy**2, 1e-12)
+        r = np.sqrt(r2)
+
+        pan_calc = np.arctan2(dy, dx)
+        pan_delta = pan_calc - np.radians(points[:, 2])
+        tilt_delta = np.degrees(np.arctan(r / h)) - points[:, 3]
+
+        squared_error = 2 - 2 * np.cos(pan_delta) + tilt_delta**2
+        rho, drho = PanTiltPredictor._robust_loss(squared_error, loss, loss_scale)
+        error = np.sum(rho)
+
+        # d(pan_error)/d(pan_calc) and d(tilt_error)/d(tilt_calc in radians), weighted by the loss
+        dpan = drho * 2 * np.sin(pan_delta)
+        dtilt = drho * 2 * tilt_delta * np.degrees(1.0)
+        denom = h**2 + r2
+
+        grad_Lx = np.sum(dpan * dy / r2 + dtilt * (h / denom) * (-dx / r))
+        grad_Ly = np.sum(dpan * -dx / r2 + dtilt * (h / denom) * (-dy / r))
+        grad_h = np.sum(dtilt * -r / denom)
+
+        return error, np.array([grad_Lx, grad_Ly, grad_h])
+
+    @staticmethod
+    def _bounds(points):
+        """
+        Search bounds for (Lx, Ly, h): 10 ft beyond the reference points, 1-100 ft high.
         """
-        def error_function(params):
-            Lx, Ly, h = params
-            total_error = 0
-            for (x, y, pan_obs, tilt_obs) in self.four_points:
-                pan_calc, tilt_calc = self._compute_pan_tilt(Lx, Ly, h, x, y)
-                # Convert pan angles to radians for vector representation
-                pan_obs_rad = np.radians(pan_obs)
-                pan_calc_rad = np.radians(pan_calc)
-                # Compute vector components
-                cos_obs = np.cos(pan_obs_rad)
-                sin_obs = np.sin(pan_obs_rad)
-                cos_calc = np.cos(pan_calc_rad)
-                sin_calc = np.sin(pan_calc_rad)
-                # Compute pan error as squared Euclidean distance between vectors
-                pan_error = (cos_calc - cos_obs)**2 + (sin_calc - sin_obs)**2
-                # Compute tilt error
-                tilt_error = (tilt_calc - tilt_obs)**2
-                # Accumulate total error
-                total_error += pan_error + tilt_error
-            return total_error
-
-        # Initial guess: center of the stage and an arbitrary height
-        x_coords = [p[0] for p in self.four_points]
-        y_coords = [p[1] for p in self.four_points]
-        initial_Lx = (max(x_coords) + min(x_coords)) / 2
-        initial_Ly = (max(y_coords) + min(y_coords)) / 2
-        initial_h = 10.0  # Initial guess for height in feet
-
-        initial_guess = [initial_Lx, initial_Ly, initial_h]
-
-        # Define bounds to ensure meaningful optimization
         # Assuming the light is above the stage, set reasonable bounds
-        stage_min_x = min(x_coords) - 10
-        stage_max_x = max(x_coords) + 10
-        stage_min_y = min(y_coords) - 10
-        stage_max_y = max(y_coords) + 10
+        stage_min_x = points[:, 0].min() - 10
+        stage_max_x = points[:, 0].max() + 10
+        stage_min_y = points[:, 1].min() - 10
+        stage_max_y = points[:, 1].max() + 10
         h_min = 1.0   # Minimum height
         h_max = 100.0 # Maximum height
 
-        bounds = [
+        return [
             (stage_min_x, stage_max_x),  # Lx bounds
             (stage_min_y, stage_max_y),  # Ly bounds
             (h_min, h_max)               # h bounds
         ]
 
-        # Perform optimization to minimize the error function
-        result = minimize(
-            error_function,
+    @staticmethod
+    def _initial_guess(points, bounds):
+        """
+        Closed-form starting point for the light position.
+
+        (Lx, Ly) is the least-squares intersection of the observed pan rays: each
+        reference point lies on the ray from the light with the observed pan, so the
+        light lies on the line through that point with that direction. The height is
+        the median of distance / tan(tilt) over the points. Falls back to the stage
+        centre and 10 ft when the rays are (nearly) parallel.
+        """
+        x, y, pan, tilt = points.T
+        pan_rad = np.radians(pan)
+        normals = np.column_stack([-np.sin(pan_rad), np.cos(pan_rad)])
+        A = normals.T @ normals
+        b = normals.T @ np.sum(normals * points[:, :2], axis=1)
+
+        if np.linalg.cond(A) < 1e6:
+            Lx, Ly = np.linalg.solve(A, b)
+        else:
+            Lx = (x.max() + x.min()) / 2
+            Ly = (y.max() + y.min()) / 2
+
+        distances = np.hypot(x - Lx, y - Ly)
+        usable = (tilt > 1) & (tilt < 89)
+        if np.any(usable):
+            h = float(np.median(distances[usable] / np.tan(np.radians(tilt[usable]))))
+        else:
+            h = 10.0
+
+        return [float(np.clip(value, low, high)) for value, (low, high) in zip((Lx, Ly, h), bounds)]
+
+    @staticmethod
+    def _solve(points, loss="linear", loss_scale=1.0, initial_guess=None, maxiter=10000):
+        """
+        Run L-BFGS-B with the analytic gradient on an (n, 4) array of
+        (x, y, pan 0-360, tilt) points and return the scipy result.
+        """
+        bounds = PanTiltPredictor._bounds(points)
+        if initial_guess is None:
+            initial_guess = PanTiltPredictor._initial_guess(points, bounds)
+        else:
+            initial_guess = [float(np.clip(value, low, high)) for value, (low, high) in zip(initial_guess, bounds)]
+
+        return minimize(
+            PanTiltPredictor._error_and_gradient,
             initial_guess,
+            args=(points, loss, loss_scale),
             method='L-BFGS-B',
+            jac=True,
             bounds=bounds,
-            options={'ftol': 1e-12, 'maxiter': 10000}
+            options={'ftol': 1e-12, 'maxiter': maxiter}
         )
 
+    @staticmethod
+    def _angular_residuals(light_position, points):
+        """
+        Signed (pan, tilt) errors in degrees of each point for a light position.
+        Pan errors are wrapped to [-180, 180).
+        """
+        pan_calc, tilt_calc = PanTiltPredictor._compute_pan_tilt(*light_position, points[:, 0], points[:, 1])
+        pan_error = (pan_calc - points[:, 2] + 180) % 360 - 180
+        return np.column_stack([pan_error, tilt_calc - points[:, 3]])
+
+    def _find_light_position(self, initial_guess=None):
+        """
+        Determine the light's position (Lx, Ly, h) using the inlying reference points.
+
+        Returns:
+        - Tuple containing (Lx, Ly, h) in feet.
+        """
+        points = np.array(self.reference_points, dtype=float)[self.inlier_mask]
+
+        # Perform optimization to minimize the error function using its analytic gradient
+        result = self._solve(points, self.loss, self.loss_scale, initial_guess)
+        self.optimization_result = result
+
         if result.success:
             Lx, Ly, h = result.x
             if h <= 0:
@@ -128,6 +293,159 @@ class PanTiltPredictor:
         else:
             raise RuntimeError("Optimization failed to determine the light position.")
 
+    def _candidate_subsets(self):
+        """
+        Index subsets of sample_size points: all of them if there are at most
+        max_trials, otherwise max_trials random ones.
+        """
+        n = len(self.reference_points)
+        subsets = list(itertools.combinations(range(n), self.sample_size))
+        if len(subsets) <= self.max_trials:
+            return subsets
+
+        rng = np.random.default_rng(self.random_state)
+        picks = rng.choice(len(subsets), size=self.max_trials, replace=False)
+        return [subsets[i] for i in picks]
+
+    def _find_light_position_ransac(self):
+        """
+        Determine the light's position while rejecting outlying reference points.
+
+        Every candidate subset is solved (in parallel) and scored by how many points
+        fall within inlier_threshold degrees of it, ties broken by the total error of
+        those inliers. The best candidate's inliers are then refitted, starting from
+        that candidate, and the remaining points are recorded as rejected.
+
+        Returns:
+        - Tuple containing (Lx, Ly, h) in feet.
+        """
+        points = np.array(self.reference_points, dtype=float)
+        subsets = self._candidate_subsets()
+        jobs = [(points[list(subset)], self.loss, self.loss_scale) for subset in subsets]
+
+        workers = self.n_jobs or os.cpu_count() or 1
+        if workers == 1:
+            candidates = [_solve_candidate(job) for job in jobs]
+        else:
+            chunksize = max(1, len(jobs) // (4 * workers))
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                candidates = list(executor.map(_solve_candidate, jobs, chunksize=chunksize))
+
+        best_candidate, best_mask, best_score = None, None, None
+        for candidate in candidates:
+            if candidate is None:
+                continue
+            errors = np.hypot(*self._angular_residuals(candidate, points).T)
+            mask = errors <= self.inlier_threshold
+            score = (mask.sum(), -errors[mask].sum())
+            if best_score is None or score > best_score:
+                best_candidate, best_mask, best_score = candidate, mask, score
+
+        if best_candidate is None or best_mask.sum() < self.sample_size:
+            # No consensus: fall back to fitting every point with the robust loss
+            return self._find_light_position()
+
+        self.inlier_mask = best_mask
+        return self._find_light_position(initial_guess=best_candidate)
+
+    @property
+    def rejected_indices(self):
+        """Indices of the reference points rejected as outliers."""
+        return [int(i) for i in np.flatnonzero(~self.inlier_mask)]
+
+    def get_rejected_points(self):
+        """
+        Get the reference points rejected as outliers.
+
+        Returns:
+        - List of (x, y, pan, tilt) tuples as given (pan in 0-360).
+        """
+        return [self.reference_points[i] for i in self.rejected_indices]
+
+    def residuals(self):
+        """
+        Get the fit residuals of every reference point, including rejected ones.
+
+        Returns:
+        - (n, 2) NumPy array of signed (pan error, tilt error) in degrees.
+        """
+        return self._angular_residuals(self.light_position, np.array(self.reference_points, dtype=float))
+
+    def add_observation(self, x, y, pan, tilt, max_iterations=20, drift_smoothing=0.3):
+        """
+        Add a confirmed pan/tilt <-> stage correspondence observed during the show
+        and refine the light position incrementally.
+
+        The solve is warm-started from the current light position and capped at
+        max_iterations, so it only nudges the model instead of refitting from scratch.
+        Only the latest max_observations online observations are kept alongside the
+        original calibration points.
+
+        Parameters:
+        - x, y: Coordinates of the observed point on stage in feet.
+        - pan, tilt: Fixture pan/tilt in degrees that hit the point. A flipped
+            position (negative tilt) is converted to its pan + 180 equivalent.
+        - drift_smoothing: Weight of the newest error in the running drift estimate.
+
+        Returns:
+        - Angular error in degrees of the model's prediction for the observation,
+          measured before the update.
+        """
+        if tilt < 0:
+            pan, tilt = pan + 180, -tilt
+        observation = (x, y, pan % 360, tilt)
+
+        error = float(np.hypot(*self._angular_residuals(self.light_position, np.array([observation], dtype=float))[0]))
+        self.observation_errors.append(error)
+        if self.drift is None:
+            self.drift = error
+        else:
+            self.drift = drift_smoothing * error + (1 - drift_smoothing) * self.drift
+
+        self.reference_points.append(observation)
+        self.inlier_mask = np.append(self.inlier_mask, True)
+        if len(self.reference_points) - self.calibration_size > self.max_observations:
+            del self.reference_points[self.calibration_size]
+            self.inlier_mask = np.delete(self.inlier_mask, self.calibration_size)
+            del self.observation_errors[0]
+
+        points = np.array(self.reference_points, dtype=float)[self.inlier_mask]
+        result = self._solve(points, self.loss, self.loss_scale, initial_guess=self.light_position, maxiter=max_iterations)
+        # Hitting the iteration cap still leaves a better estimate than the warm start
+        if result.x[2] > 0 and result.fun <= self._error_and_gradient(np.array(self.light_position), points, self.loss, self.loss_scale)[0]:
+            self.light_position = tuple(result.x)
+        self.optimization_result = result
+
+        return error
+
+    def rebase_on_observations(self, min_observations=3):
+        """
+        Refit from the online observations alone, excluding the original calibration
+        points, e.g. after the fixture was bumped and the calibration went stale.
+
+        Returns:
+        - True if there were enough observations to refit.
+        """
+        if len(self.reference_points) - self.calibration_size < min_observations:
+            return False
+
+        self.inlier_mask[:self.calibration_size] = False
+        self.light_position = self._find_light_position(initial_guess=self.light_position)
+        self.drift = None
+        return True
+
+    def drift_detected(self, threshold):
+        """
+        Check whether the running error of online observations exceeds a threshold.
+
+        Parameters:
+        - threshold: Angular error in degrees.
+
+        Returns:
+        - True if the fixture's observations have drifted away from the model.
+        """
+        return self.drift is not None and self.drift > threshold
+
     def predict_pan_tilt(self, x, y, return_original_format=True):
         """
         Predict the pan and tilt angles for a given (x, y) point.
@@ -148,6 +466,76 @@ class PanTiltPredictor:
 
         return pan, tilt
 
+    def predict_pan_tilt_batch(self, x, y, return_original_format=True, pan_range=None, tilt_range=None, current_pan=0.0, current_tilt=0.0):
+        """
+        Predict pan and tilt angles for arrays of (x, y) points in one vectorized pass.
+
+        Parameters:
+        - x, y: Array-likes of target coordinates in feet (broadcastable).
+        - return_original_format: If True, outputs pan in -270 to 270 format.
+        - pan_range, tilt_range: Optional (min, max) fixture limits in degrees. When both
+          are given, each prediction is resolved to the equivalent pan/tilt within the
+          limits that is nearest to (current_pan, current_tilt), see nearest_equivalent_pan_tilt.
+
+        Returns:
+        - Tuple of NumPy arrays (pan in degrees, tilt in degrees). Points with no valid
+          equivalent inside the limits are NaN.
+        """
+        Lx, Ly, h = self.light_position
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        pan, tilt = self._compute_pan_tilt(Lx, Ly, h, x, y)
+
+        if return_original_format:
+            pan = np.where(pan > 270, pan - 360, pan)
+
+        if pan_range is not None and tilt_range is not None:
+            pan, tilt = self.nearest_equivalent_pan_tilt(pan, tilt, pan_range, tilt_range, current_pan, current_tilt)
+
+        return pan, tilt
+
+    @staticmethod
+    def nearest_equivalent_pan_tilt(pan, tilt, pan_range, tilt_range, current_pan=0.0, current_tilt=0.0):
+        """
+        Resolve arrays of pan/tilt targets to the equivalent fixture position nearest to
+        the current one.
+
+        Candidates are the target itself and, for |pan| > 90, the flipped position
+        (pan -/+ 180, -tilt), each shifted by -360, 0 and +360 degrees of pan. Candidates
+        outside pan_range/tilt_range are discarded and the remaining one with the smallest
+        |pan - current_pan| + |tilt - current_tilt| is chosen (first candidate wins ties).
+
+        Returns:
+        - Tuple of NumPy arrays (pan, tilt), NaN where no candidate is within the limits.
+        """
+        pan = np.asarray(pan, dtype=float)
+        tilt = np.asarray(tilt, dtype=float)
+        pan_min, pan_max = pan_range
+        tilt_min, tilt_max = tilt_range
+
+        flipped = (pan > 90) | (pan < -90)
+        flipped_pan = np.where(pan > 90, pan - 180, pan + 180)
+        shifts = np.array([-360.0, 0.0, 360.0])
+
+        # Candidate axis is last: three shifts of the target, then three of the flipped position
+        candidate_pan = np.concatenate([pan[..., None] + shifts, flipped_pan[..., None] + shifts], axis=-1)
+        candidate_tilt = np.concatenate([np.repeat(tilt[..., None], 3, axis=-1), np.repeat(-tilt[..., None], 3, axis=-1)], axis=-1)
+        available = np.concatenate([np.ones(pan.shape + (3,), dtype=bool), np.repeat(flipped[..., None], 3, axis=-1)], axis=-1)
+
+        valid = (
+            available
+            & (candidate_pan >= pan_min) & (candidate_pan <= pan_max)
+            & (candidate_tilt >= tilt_min) & (candidate_tilt <= tilt_max)
+        )
+        cost = np.abs(candidate_pan - current_pan) + np.abs(candidate_tilt - current_tilt)
+        cost = np.where(valid, cost, np.inf)
+        best = np.argmin(cost, axis=-1)[..., None]
+
+        nearest_pan = np.take_along_axis(candidate_pan, best, axis=-1)[..., 0]
+        nearest_tilt = np.take_along_axis(candidate_tilt, best, axis=-1)[..., 0]
+        found = valid.any(axis=-1)
+        return np.where(found, nearest_pan, np.nan), np.where(found, nearest_tilt, np.nan)
+
     def get_light_position(self):
         """
         Get the determined position of the light.
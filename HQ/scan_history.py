@@ -0,0 +1,269 @@
+import numpy as np
+
+POSITION_DTYPE = np.dtype([("pan", np.float64), ("tilt", np.float64), ("direction", np.int8)])
+
+
+class ScanHistory:
+    def __init__(self, capacity=4096):
+        """
+        Scan samples of one fixture in preallocated, growable NumPy arrays.
+
+        Each scan step is one row: the fixture position as a structured array
+        (pan, tilt, direction) and one float32 intensity column per sensor.
+        Storage doubles when full, so appending is amortized O(1).
+
+        Parameters:
+        - capacity: Initial number of rows.
+        """
+        self.size = 0
+        self._positions = np.zeros(capacity, dtype=POSITION_DTYPE)
+        self._intensities = np.full((capacity, 0), np.nan, dtype=np.float32)
+        self.sensor_ids = []
+        self._columns = {}
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, sensor_id):
+        return sensor_id in self._columns
+
+    def _grow(self, rows, columns):
+        capacity, width = self._intensities.shape
+        if rows > capacity:
+            capacity = max(rows, capacity * 2)
+            positions = np.zeros(capacity, dtype=POSITION_DTYPE)
+            positions[:self.size] = self._positions[:self.size]
+            self._positions = positions
+        if rows > self._intensities.shape[0] or columns > width:
+            intensities = np.full((capacity, max(columns, width)), np.nan, dtype=np.float32)
+            intensities[:self.size, :width] = self._intensities[:self.size]
+            self._intensities = intensities
+
+    def append(self, pan, tilt, direction, readings):
+        """
+        Record one scan step.
+
+        Parameters:
+        - pan, tilt: Fixture position in degrees.
+        - direction: Sweep direction (1 or -1).
+        - readings: Dict of sensor_id -> intensity. Sensors missing from a step are NaN.
+        """
+        for sensor_id in readings:
+            if sensor_id not in self._columns:
+                self._columns[sensor_id] = len(self.sensor_ids)
+                self.sensor_ids.append(sensor_id)
+        self._grow(self.size + 1, len(self.sensor_ids))
+
+        self._positions[self.size] = (pan, tilt, direction)
+        row = self._intensities[self.size]
+        for sensor_id, intensity in readings.items():
+            row[self._columns[sensor_id]] = intensity
+        self.size += 1
+
+    @property
+    def pan(self):
+        return self._positions["pan"][:self.size]
+
+    @property
+    def tilt(self):
+        return self._positions["tilt"][:self.size]
+
+    @property
+    def direction(self):
+        return self._positions["direction"][:self.size]
+
+    @property
+    def intensities(self):
+        """(steps, sensors) intensity matrix, columns ordered as sensor_ids."""
+        return self._intensities[:self.size, :len(self.sensor_ids)]
+
+    def intensity(self, sensor_id):
+        return self.intensities[:, self._columns[sensor_id]]
+
+    def row(self, index):
+        """
+        One recorded step, as the (pan, tilt, direction, readings) arguments of append.
+        """
+        pan, tilt, direction = self._positions[index]
+        readings = {
+            sensor_id: float(intensity)
+            for sensor_id, intensity in zip(self.sensor_ids, self._intensities[index])
+            if not np.isnan(intensity)
+        }
+        return float(pan), float(tilt), int(direction), readings
+
+    def peaks(self, direction=None, since=0):
+        """
+        Highest-intensity sample of every sensor, found with one vectorized argmax.
+
+        Parameters:
+        - direction: If given (1 or -1), only consider samples from that sweep direction.
+        - since: Only consider samples from this row on.
+
+        Returns:
+        - Dict of sensor_id -> dict with "intensity", "pan", "tilt" and "direction".
+          Sensors without any sample are left out.
+        """
+        if self.size == 0:
+            return {}
+
+        intensities = np.where(np.isnan(self.intensities), -np.inf, self.intensities)
+        if direction is not None:
+            intensities = np.where((self.direction == direction)[:, None], intensities, -np.inf)
+        if since:
+            intensities = np.where((np.arange(self.size) >= since)[:, None], intensities, -np.inf)
+        best = np.argmax(intensities, axis=0)
+        return {
+            sensor_id: {
+                "intensity": float(intensities[best[column], column]),
+                "pan": float(self.pan[best[column]]),
+                "tilt": float(self.tilt[best[column]]),
+                "direction": int(self.direction[best[column]]),
+            }
+            for column, sensor_id in enumerate(self.sensor_ids)
+            if np.isfinite(intensities[best[column], column])
+        }
+
+    def sample_spacing(self, pan, tilt, direction=None, since=0):
+        """
+        Degrees between neighbouring samples around pan/tilt: the larger of the gap
+        to the nearest other pan in the same row (and sweep direction, if given) and
+        to the nearest other row. 0 if there is no neighbouring sample.
+
+        Parameters:
+        - pan, tilt: Position of a sample, e.g. a sensor's peak.
+        - direction: If given (1 or -1), only consider pans from that sweep direction.
+        - since: Only consider samples from this row on.
+        """
+        recent = np.arange(self.size) >= since
+        row = recent & (self.tilt == tilt)
+        if direction is not None:
+            row &= self.direction == direction
+        pan_gaps = np.abs(self.pan[row] - pan)
+        tilt_gaps = np.abs(self.tilt[recent] - tilt)
+        pan_gaps, tilt_gaps = pan_gaps[pan_gaps > 0], tilt_gaps[tilt_gaps > 0]
+        return float(max(pan_gaps.min() if pan_gaps.size else 0.0, tilt_gaps.min() if tilt_gaps.size else 0.0))
+
+    def fit_peak(self, sensor_id, radius=3.0, min_samples=6, direction=None, since=0, min_steps=2):
+        """
+        Sub-step peak position of a sensor from a local 2D Gaussian fit.
+
+        Takes the samples within radius degrees of the highest-intensity sample, or
+        min_steps sample spacings if that is wider (see sample_spacing), that
+        were recorded in the same sweep direction (lag differs between directions),
+        and fits a quadratic in pan/tilt to the log of their intensity above the
+        sensor's ambient baseline (the median of all its samples). The vertex of
+        the quadratic is the estimated peak. If direction is given, only samples
+        from that sweep direction are considered, and if since is given only samples
+        from that row on (e.g. to leave out a pass made with a different beam).
+
+        Returns:
+        - Dict with "pan", "tilt", "direction", "intensity" (of the best sample) and
+          "confidence" in [0, 1]: the fit's R² if the fitted surface is a proper peak
+          inside the window, otherwise 0 and the best sample's position. None if the
+          sensor has no samples (in that direction).
+        """
+        peak = self.peaks(direction, since).get(sensor_id)
+        if peak is None:
+            return None
+        result = dict(peak, confidence=0.0)
+        radius = max(radius, min_steps * self.sample_spacing(peak["pan"], peak["tilt"], peak["direction"], since))
+
+        intensity = self.intensity(sensor_id)
+        baseline = np.nanmedian(intensity[since:])
+        mask = (
+            (np.abs(self.pan - peak["pan"]) <= radius)
+            & (np.abs(self.tilt - peak["tilt"]) <= radius)
+            & (self.direction == peak["direction"])
+            & (intensity > baseline)
+            & (np.arange(self.size) >= since)
+        )
+        if mask.sum() < min_samples:
+            return result
+
+        # Centre on the best sample to keep the least-squares system well conditioned
+        p = self.pan[mask] - peak["pan"]
+        t = self.tilt[mask] - peak["tilt"]
+        z = np.log(intensity[mask].astype(np.float64) - baseline)
+        design = np.column_stack([np.ones_like(p), p, t, p**2, t**2, p * t])
+        coefficients, _, rank, _ = np.linalg.lstsq(design, z, rcond=None)
+        if rank < design.shape[1]:
+            return result
+
+        _, b, c, d, e, f = coefficients
+        hessian = np.array([[2 * d, f], [f, 2 * e]])
+        # A peak needs a negative definite Hessian
+        if hessian[0, 0] >= 0 or np.linalg.det(hessian) <= 0:
+            return result
+
+        offset_pan, offset_tilt = np.linalg.solve(hessian, [-b, -c])
+        if abs(offset_pan) > radius or abs(offset_tilt) > radius:
+            return result
+
+        residual = z - design @ coefficients
+        total = np.sum((z - z.mean())**2)
+        r_squared = 1 - np.sum(residual**2) / total if total > 0 else 0.0
+
+        result["pan"] = float(peak["pan"] + offset_pan)
+        result["tilt"] = float(peak["tilt"] + offset_tilt)
+        result["confidence"] = float(np.clip(r_squared, 0, 1))
+        return result
+
+    def window(self, sensor_id, pan, tilt, pan_window, tilt_window):
+        """
+        Samples of a sensor within +/- pan_window and tilt_window degrees of pan/tilt.
+
+        Returns:
+        - Tuple of arrays (pan, tilt, direction, intensity).
+        """
+        mask = (np.abs(self.pan - pan) <= pan_window) & (np.abs(self.tilt - tilt) <= tilt_window)
+        intensity = self.intensity(sensor_id)
+        mask &= ~np.isnan(intensity)
+        return self.pan[mask], self.tilt[mask], self.direction[mask], intensity[mask]
+
+    def to_arrays(self, prefix=""):
+        """Arrays for np.savez, keyed by prefix + field name."""
+        return {
+            f"{prefix}pan": self.pan,
+            f"{prefix}tilt": self.tilt,
+            f"{prefix}direction": self.direction,
+            f"{prefix}intensities": self.intensities,
+            f"{prefix}sensor_ids": np.array([str(sensor_id) for sensor_id in self.sensor_ids]),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix=""):
+        size = len(arrays[f"{prefix}pan"])
+        history = cls(capacity=max(1, size))
+        history.sensor_ids = [int(sensor_id) if sensor_id.isdigit() else sensor_id for sensor_id in arrays[f"{prefix}sensor_ids"]]
+        history._columns = {sensor_id: column for column, sensor_id in enumerate(history.sensor_ids)}
+        history._grow(size, len(history.sensor_ids))
+        history._positions["pan"][:size] = arrays[f"{prefix}pan"]
+        history._positions["tilt"][:size] = arrays[f"{prefix}tilt"]
+        history._positions["direction"][:size] = arrays[f"{prefix}direction"]
+        history._intensities[:size, :len(history.sensor_ids)] = arrays[f"{prefix}intensities"]
+        history.size = size
+        return history
+
+
+def save_histories(path, histories):
+    """
+    Save the scan histories of several channels to one compressed .npz file.
+    """
+    arrays = {}
+    for channel, history in histories.items():
+        arrays.update(history.to_arrays(prefix=f"{channel}/"))
+    np.savez_compressed(path, **arrays)
+
+
+def load_histories(path):
+    """
+    Load scan histories saved with save_histories.
+
+    Returns:
+    - Dict of channel -> ScanHistory.
+    """
+    with np.load(path) as data:
+        arrays = {key: data[key] for key in data.files}
+    channels = {key.split("/", 1)[0] for key in arrays}
+    return {channel: ScanHistory.from_arrays(arrays, prefix=f"{channel}/") for channel in channels}
@@ -0,0 +1,473 @@
+"""
+Rig simulator: virtual moving lights and light sensors for developing the
+navigator without a console, movers or Raspberry Pi sensors.
+
+SimulatedRig stands in for the EOS OSC endpoint: it has the send_message method
+of the udp_client EOS.client, so it can replace it directly, or it can serve OSC
+on a UDP port (serve_osc). Each SimulatedFixture follows its commands after a
+latency at a finite pan/tilt speed and projects a Gaussian beam, and every
+virtual sensor reads the light falling on its stage position.
+
+In virtual time (run_scan), a VirtualClock replaces the navigator's sleeps and
+a VirtualCondition its waits for fresh samples, and readings are written straight
+into the sensor_data dict, so a full scan takes seconds. In real time (serve), sensor readings are streamed to the app over the
+same websocket protocol as Sensor/send.py.
+
+Stage coordinates are in feet in the frame of pan_tilt_predictor.py: a fixture
+at (Lx, Ly, h) aimed at pan/tilt hits the stage point that
+PanTiltPredictor._compute_pan_tilt maps to that pan/tilt.
+
+Usage:
+    python simulator.py scan --rig rig.json --mode sweep
+    python simulator.py serve --rig rig.json --osc-port 8000 --uri ws://127.0.0.1:8765/ws
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from threading import Lock
+
+import numpy as np
+from pythonosc import dispatcher, osc_server
+
+from pan_tilt_predictor import PanTiltPredictor
+
+# Two fixtures over the four sensors of the GUI's default layout
+DEFAULT_RIG = {
+    "fixtures": {
+        "1": {"position": [8.0, -6.0, 18.0]},
+        "2": {"position": [22.0, -6.0, 18.0]},
+    },
+    "sensors": {
+        "1": [5.0, 4.0],
+        "2": [25.0, 4.0],
+        "3": [5.0, 16.0],
+        "4": [25.0, 16.0],
+    },
+}
+
+
+class VirtualClock:
+    def __init__(self, start=0.0):
+        """
+        Simulated time for Navigator(clock=...): sleep advances the time instantly
+        and notifies listeners (e.g. SimulatedRig.advance) of the new time.
+        """
+        self.now = start
+        self.listeners = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(0.0, seconds)
+        for listener in self.listeners:
+            listener(self.now)
+
+
+class VirtualCondition:
+    def __init__(self, clock, interval):
+        """
+        Stands in for the app's new_sample Condition (see Navigator.wait_for_samples)
+        in virtual time: waiting advances the clock interval seconds at a time until
+        the predicate holds, at least once. The scan is single-threaded, so nothing
+        is locked.
+        """
+        self.clock = clock
+        self.interval = interval
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def wait_for(self, predicate, timeout=None):
+        # A fresh sample is never already there: readings taken at the instant of a
+        # command don't reflect it, so time always passes
+        end = self.clock.now + (timeout if timeout is not None else np.inf)
+        while True:
+            self.clock.sleep(min(self.interval, end - self.clock.now))
+            result = predicate()
+            if result or self.clock.now >= end:
+                return result
+
+
+class SimulatedFixture:
+    def __init__(self, position, pan_range=(-270, 270), tilt_range=(-115, 115), pan_speed=60.0, tilt_speed=60.0,
+                 latency=0.1, light_latency=0.05, beam_angle=8.0, peak=1000.0, zoom_parameter="zoom"):
+        """
+        A moving light.
+
+        Parameters:
+        - position: (Lx, Ly, h) of the fixture in feet.
+        - pan_range, tilt_range: Limits in degrees, written to .fixtures.json by run_scan.
+        - pan_speed, tilt_speed: Degrees per second.
+        - latency: Seconds from a pan/tilt command until the fixture starts moving.
+        - light_latency: Seconds from an intensity command until the output changes.
+        - beam_angle: Beam width in degrees at half the peak intensity. Setting
+            zoom_parameter changes it to the value sent.
+        - peak: Reading at full intensity on a sensor in the beam centre, 10 ft away.
+        """
+        self.position = np.asarray(position, dtype=float)
+        self.pan_range = tuple(pan_range)
+        self.tilt_range = tuple(tilt_range)
+        self.speed = np.array([pan_speed, tilt_speed], dtype=float)
+        self.latency = latency
+        self.light_latency = light_latency
+        self.beam_angle = beam_angle
+        self.peak = peak
+        self.zoom_parameter = zoom_parameter
+
+        self.time = 0.0
+        self.pan_tilt = np.zeros(2)
+        self.target = np.zeros(2)
+        self.intensity = 0.0
+        self.parameters = {}
+        self.pending = []  # (time it takes effect, name, value), in command order
+
+    def command(self, now, name, value):
+        delay = self.light_latency if name == "intensity" else self.latency
+        self.pending.append((now + delay, name, float(value)))
+
+    def advance(self, now):
+        """Applies the commands due by now and moves the fixture up to now."""
+        while self.pending and self.pending[0][0] <= now:
+            due, name, value = self.pending.pop(0)
+            self._move(due)
+            if name == "intensity":
+                self.intensity = value
+            elif name == "pan":
+                self.target[0] = value
+            elif name == "tilt":
+                self.target[1] = value
+            else:
+                self.parameters[name] = value
+                if name == self.zoom_parameter:
+                    self.beam_angle = value
+        self._move(now)
+
+    def _move(self, now):
+        elapsed = max(0.0, now - self.time)
+        self.pan_tilt += np.clip(self.target - self.pan_tilt, -self.speed * elapsed, self.speed * elapsed)
+        self.time = max(self.time, now)
+
+    def illuminance(self, points):
+        """
+        Readings at stage points (n, 2) from a Gaussian beam with inverse-square
+        falloff, on sensors facing straight up.
+        """
+        if self.intensity <= 0:
+            return np.zeros(len(points))
+        pan, tilt = np.radians(self.pan_tilt)
+        beam = np.array([np.sin(tilt) * np.cos(pan), np.sin(tilt) * np.sin(pan), -np.cos(tilt)])
+
+        offsets = np.column_stack([points - self.position[:2], np.full(len(points), -self.position[2])])
+        distance = np.linalg.norm(offsets, axis=1)
+        angle = np.degrees(np.arccos(np.clip(offsets @ beam / distance, -1, 1)))
+        sigma = self.beam_angle / (2 * np.sqrt(2 * np.log(2)))
+        return (
+            self.peak * self.intensity / 100
+            * np.exp(-0.5 * (angle / sigma)**2)
+            * (10.0 / distance)**2
+            * (self.position[2] / distance)
+        )
+
+    def fixture_data(self):
+        """This fixture's limits and motion model (see EOS.get_motion_model) for .fixtures.json."""
+        return {
+            "pan": list(self.pan_range),
+            "tilt": list(self.tilt_range),
+            "pan_speed": float(self.speed[0]),
+            "tilt_speed": float(self.speed[1]),
+            "latency": self.latency,
+        }
+
+
+class SimulatedRig:
+    def __init__(self, fixtures, sensors, ambient=5.0, noise=0.01, sample_interval=0.1, seed=None):
+        """
+        Fixtures and sensors on a stage, driven by EOS OSC messages.
+
+        Parameters:
+        - fixtures: Dict of channel (str) -> SimulatedFixture.
+        - sensors: Dict of sensor_id -> (x, y) in feet.
+        - ambient: Reading of every sensor with all fixtures dark.
+        - noise: Relative standard deviation of each reading.
+        - sample_interval: Seconds between readings of each sensor. The default matches
+            the app's debounce_interval, at which the navigator gets new values.
+        """
+        self.fixtures = fixtures
+        self.sensor_ids = list(sensors)
+        self.sensor_positions = np.array([sensors[sensor_id] for sensor_id in self.sensor_ids], dtype=float)
+        self.ambient = ambient
+        self.noise = noise
+        self.sample_interval = sample_interval
+        self.rng = np.random.default_rng(seed)
+
+        # Latest reading and its time per sensor, in the layout the app gives the navigator
+        self.lock = Lock()
+        self.sensor_data = {}
+        self.sample_times = {}
+        self.next_sample = 0.0
+        self.clock = time.monotonic
+        self.messages = 0
+
+    @classmethod
+    def from_config(cls, config, **options):
+        """
+        Builds a rig from a dict like DEFAULT_RIG: "fixtures" maps channels to
+        SimulatedFixture keyword arguments, "sensors" maps sensor ids to [x, y].
+        """
+        fixtures = {str(channel): SimulatedFixture(**settings) for channel, settings in config["fixtures"].items()}
+        sensors = {int(sensor_id) if str(sensor_id).isdigit() else sensor_id: tuple(position) for sensor_id, position in config["sensors"].items()}
+        return cls(fixtures, sensors, **options)
+
+    def send_message(self, address, value):
+        """
+        Handles an EOS OSC message (/eos/chan/<channel>/intensity or
+        /eos/chan/<channel>/param/<parameter>), like udp_client.SimpleUDPClient.
+        """
+        parts = address.strip("/").split("/")
+        if len(parts) < 4 or parts[:2] != ["eos", "chan"] or parts[2] not in self.fixtures:
+            logging.debug(f"Simulator ignored OSC message {address} {value}")
+            return
+        if parts[3] == "intensity":
+            name = "intensity"
+        elif parts[3] == "param" and len(parts) == 5:
+            name = parts[4]
+        else:
+            logging.debug(f"Simulator ignored OSC message {address} {value}")
+            return
+        with self.lock:
+            self.messages += 1
+            self.fixtures[parts[2]].command(self.clock(), name, value)
+
+    def advance(self, now):
+        """
+        Runs the rig up to now, taking a reading of every sensor at the last sample
+        time on or before now (earlier readings would be overwritten unseen).
+        """
+        with self.lock:
+            if now < self.next_sample:
+                return
+            sample_time = self.next_sample + np.floor((now - self.next_sample) / self.sample_interval) * self.sample_interval
+            readings = self._readings(sample_time)
+            for sensor_id, reading in zip(self.sensor_ids, readings):
+                self.sensor_data[sensor_id] = float(reading)
+                self.sample_times[sensor_id] = float(sample_time)
+            self.next_sample = sample_time + self.sample_interval
+
+    def _readings(self, now):
+        readings = np.full(len(self.sensor_ids), self.ambient)
+        for fixture in self.fixtures.values():
+            fixture.advance(now)
+            readings += fixture.illuminance(self.sensor_positions)
+        return readings * (1 + self.noise * self.rng.standard_normal(len(readings)))
+
+    def true_pan_tilt(self, channel, sensor_id):
+        """Pan (-270..270) and tilt in degrees at which a fixture is centred on a sensor."""
+        x, y = self.sensor_positions[self.sensor_ids.index(sensor_id)]
+        pan, tilt = PanTiltPredictor._compute_pan_tilt(*self.fixtures[str(channel)].position, x, y)
+        return PanTiltPredictor._map_to_negative_270_270(float(pan)), float(tilt)
+
+    def fixture_data(self):
+        """Contents for .fixtures.json."""
+        return {channel: fixture.fixture_data() for channel, fixture in self.fixtures.items()}
+
+    def serve_osc(self, ip="127.0.0.1", port=8000):
+        """
+        Receives EOS OSC messages on a UDP port in a background thread, so an
+        unmodified app can be pointed at the simulator.
+
+        Returns:
+        - The pythonosc server; call shutdown() to stop it.
+        """
+        handler = dispatcher.Dispatcher()
+        handler.set_default_handler(lambda address, *args: args and self.send_message(address, args[0]))
+        server = osc_server.ThreadingOSCUDPServer((ip, port), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        logging.info(f"Simulator receiving OSC on {ip}:{port}")
+        return server
+
+    async def stream_sensors(self, uri="ws://127.0.0.1:8765/ws"):
+        """
+        Sends every sensor's readings in real time to the app's websocket server,
+        one connection per sensor, as {"value": ..., "sensorId": ...} JSON messages
+        like Sensor/send.py, every sample_interval seconds. The app debounces them.
+        """
+        import asyncio
+        import websockets
+
+        async def sensor(sensor_id):
+            async with websockets.connect(uri) as websocket:
+                while True:
+                    self.advance(self.clock())
+                    with self.lock:
+                        value = self.sensor_data.get(sensor_id)
+                    if value is not None:
+                        await websocket.send(json.dumps({"value": value, "sensorId": sensor_id}))
+                    await asyncio.sleep(self.sample_interval)
+
+        await asyncio.gather(*(sensor(sensor_id) for sensor_id in self.sensor_ids))
+
+
+class SimulatedGUI:
+    def __init__(self, rig, stage_size=None):
+        """
+        Stands in for SensorGUI where the navigator needs the sensor layout.
+        """
+        self.rig = rig
+        self.stage_size = stage_size or tuple(np.ceil(rig.sensor_positions.max(axis=0)) + 1)
+
+    def get_sensor_ids(self):
+        return list(self.rig.sensor_ids)
+
+    def get_sensor_positions_feet(self):
+        # The GUI's y grows down the screen, against the rig's (see EOS.get_reference_points)
+        stage_height = self.stage_size[1]
+        return {sensor_id: (float(x), float(stage_height - y)) for sensor_id, (x, y) in zip(self.rig.sensor_ids, self.rig.sensor_positions)}
+
+    def get_stage_size_feet(self):
+        return self.stage_size
+
+
+def run_scan(rig, scan_mode="raster", workdir=None, configure=None):
+    """
+    Runs a complete navigator scan of the rig in virtual time.
+
+    EOS and the navigator keep their state files in the working directory, so the
+    scan runs in workdir (a new temporary directory if None), with the rig's fixture
+    data merged into its .fixtures.json. Scanning again in the same workdir after
+    moving .sensors.json to .sensors_archive.json runs the settle-time self-test
+    (see Navigator.self_test) first, as a recalibration would; the modes that jump
+    around (e.g. hierarchical) need its settle models on a rig with motion lag.
+
+    Parameters:
+    - configure: Optional callable given the Navigator before the scan, to change
+        its settings.
+
+    Returns:
+    - Dict with "simulated_time" and "wall_time" in seconds, "osc_messages",
+      "workdir", and "errors": channel -> sensor_id -> (pan error, tilt error) in
+      degrees of the calibration against the rig's geometry.
+    """
+    from EOS import EOS
+    from navigator import Navigator, Phase
+
+    workdir = workdir or tempfile.mkdtemp(prefix="hq-sim-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        fixture_data = {}
+        if os.path.exists(".fixtures.json"):
+            with open(".fixtures.json") as f:
+                fixture_data = json.load(f)
+        for channel, data in rig.fixture_data().items():
+            fixture_data[channel] = {**fixture_data.get(channel, {}), **data}
+        with open(".fixtures.json", "w") as f:
+            json.dump(fixture_data, f, indent=4)
+
+        clock = VirtualClock()
+        clock.listeners.append(rig.advance)
+        rig.clock = clock.monotonic
+
+        eos = EOS("127.0.0.1", 8000)
+        eos.client = rig
+        eos.sensors_data_file_is_valid()
+        navigator = Navigator(eos=eos, gui=SimulatedGUI(rig), sensor_data=rig.sensor_data, lock=rig.lock,
+                              scan_mode=scan_mode, sample_times=rig.sample_times,
+                              new_sample=VirtualCondition(clock, rig.sample_interval), clock=clock)
+        # A scan in virtual time isn't interrupted, so only checkpoint between channels
+        navigator.checkpoint_interval = np.inf
+        if configure:
+            configure(navigator)
+
+        start = time.perf_counter()
+        while navigator.current_phase not in (Phase.COMPLETE, Phase.FAILED):
+            navigator.execute()
+        wall_time = time.perf_counter() - start
+
+        with open(".sensors.json") as f:
+            calibration = json.load(f)
+    finally:
+        os.chdir(cwd)
+
+    errors = {}
+    for channel in rig.fixtures:
+        errors[channel] = {}
+        for sensor_id in rig.sensor_ids:
+            record = calibration.get(channel, {}).get(str(sensor_id))
+            if record is None:
+                continue
+            pan, tilt = rig.true_pan_tilt(channel, sensor_id)
+            # The same beam direction can be reached by a flipped pan/tilt
+            if record["tilt"] * tilt < 0:
+                pan, tilt = pan + 180, -tilt
+            errors[channel][sensor_id] = ((record["pan"] - pan + 180) % 360 - 180, record["tilt"] - tilt)
+
+    return {
+        "simulated_time": clock.now,
+        "wall_time": wall_time,
+        "osc_messages": rig.messages,
+        "workdir": workdir,
+        "errors": errors,
+    }
+
+
+def serve(rig, osc_ip="127.0.0.1", osc_port=8000, uri="ws://127.0.0.1:8765/ws"):
+    """
+    Runs the rig in real time for the app: OSC in on osc_port, sensor readings out
+    over websockets to uri.
+    """
+    import asyncio
+
+    server = rig.serve_osc(osc_ip, osc_port)
+    try:
+        asyncio.run(rig.stream_sensors(uri))
+    finally:
+        server.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate fixtures and sensors for the navigator.")
+    parser.add_argument("command", choices=["scan", "serve"], help="Run a scan in virtual time, or serve the rig to the app in real time.")
+    parser.add_argument("--rig", help="JSON rig description (see DEFAULT_RIG); the default rig if omitted.")
+    parser.add_argument("--mode", default="raster", help="Navigator scan mode for scan.")
+    parser.add_argument("--workdir", help="Directory for the scan's state files; a temporary directory if omitted.")
+    parser.add_argument("--noise", type=float, default=0.01, help="Relative sensor noise.")
+    parser.add_argument("--sample-interval", type=float, help="Seconds between sensor readings (default: 0.1 for scan, 0.01 for serve).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--osc-ip", default="127.0.0.1")
+    parser.add_argument("--osc-port", type=int, default=8000)
+    parser.add_argument("--uri", default="ws://127.0.0.1:8765/ws", help="Websocket server of the app.")
+    parser.add_argument("--verbose", action="store_true", help="Log the navigator's progress.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    config = DEFAULT_RIG
+    if args.rig:
+        with open(args.rig) as f:
+            config = json.load(f)
+    # Served sensors send as often as Sensor/send.py; scans see the app's debounced rate
+    sample_interval = args.sample_interval or (0.01 if args.command == "serve" else 0.1)
+    rig = SimulatedRig.from_config(config, noise=args.noise, sample_interval=sample_interval, seed=args.seed)
+
+    if args.command == "serve":
+        serve(rig, args.osc_ip, args.osc_port, args.uri)
+        return
+
+    results = run_scan(rig, args.mode, args.workdir)
+    worst = max((max(abs(pan), abs(tilt)) for sensors in results["errors"].values() for pan, tilt in sensors.values()), default=float("nan"))
+    print(json.dumps({key: value for key, value in results.items() if key != "errors"}, indent=4))
+    for channel, sensors in results["errors"].items():
+        for sensor_id, (pan, tilt) in sensors.items():
+            print(f"Channel {channel} sensor {sensor_id}: pan error {pan:+.3f}°, tilt error {tilt:+.3f}°")
+    print(f"Worst error: {worst:.3f}°")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import numpy as np
+
+
+class StageLookupTable:
+    def __init__(self, predictor, width, height, resolution=0.25, pan_range=(-270, 270), tilt_range=(-115, 115), branch_jump=90.0, tolerance=0.1):
+        """
+        Precompute pan/tilt over the stage rectangle for constant-time prediction.
+
+        Parameters:
+        - predictor: Fitted PanTiltPredictor.
+        - width, height: Stage size in feet; the grid covers [0, width] x [0, height]
+            in the predictor's coordinate frame.
+        - resolution: Grid spacing in feet.
+        - pan_range, tilt_range: Fixture limits in degrees. Every grid node holds the
+            equivalent pan/tilt within the limits nearest to home (0, 0).
+        - branch_jump: Cells whose corners differ by more than this many degrees of
+            pan or tilt straddle a branch change (or an unreachable corner) and are not
+            interpolated; lookups there fall back to the exact prediction.
+        - tolerance: Cells whose interpolated value at the centre is off by more than
+            this many degrees (e.g. right below the light, where pan changes quickly)
+            also fall back to the exact prediction.
+        """
+        if width <= 0 or height <= 0:
+            raise ValueError("Stage width and height must be positive.")
+        if resolution <= 0:
+            raise ValueError("Resolution must be positive.")
+
+        self.predictor = predictor
+        self.width = width
+        self.height = height
+        self.resolution = resolution
+        self.pan_range = tuple(pan_range)
+        self.tilt_range = tuple(tilt_range)
+
+        self.xs = np.linspace(0, width, int(np.ceil(width / resolution)) + 1)
+        self.ys = np.linspace(0, height, int(np.ceil(height / resolution)) + 1)
+        grid_x, grid_y = np.meshgrid(self.xs, self.ys)
+        self.pan, self.tilt = self._exact(grid_x, grid_y)
+
+        # A cell is interpolable only if all four corners are reachable and on the same branch
+        corners = lambda a: np.stack([a[:-1, :-1], a[:-1, 1:], a[1:, :-1], a[1:, 1:]])
+        pan_spread = np.ptp(corners(self.pan), axis=0)
+        tilt_spread = np.ptp(corners(self.tilt), axis=0)
+        self.interpolable = (pan_spread <= branch_jump) & (tilt_spread <= branch_jump)
+
+        # Check each cell's centre against the exact prediction
+        centre_x, centre_y = np.meshgrid((self.xs[:-1] + self.xs[1:]) / 2, (self.ys[:-1] + self.ys[1:]) / 2)
+        centre_pan, centre_tilt = self._exact(centre_x, centre_y)
+        with np.errstate(invalid="ignore"):
+            accurate = (
+                (np.abs(corners(self.pan).mean(axis=0) - centre_pan) <= tolerance)
+                & (np.abs(corners(self.tilt).mean(axis=0) - centre_tilt) <= tolerance)
+            )
+        self.interpolable &= accurate
+
+    def _exact(self, x, y):
+        return self.predictor.predict_pan_tilt_batch(x, y, pan_range=self.pan_range, tilt_range=self.tilt_range)
+
+    def lookup(self, x, y):
+        """
+        Pan/tilt for stage points by bilinear interpolation of the grid.
+
+        Points outside the stage rectangle, or in cells that straddle a branch change
+        or exceed the tolerance, are predicted exactly instead.
+
+        Returns:
+        - Tuple of NumPy arrays (pan, tilt) in degrees, NaN where unreachable.
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+
+        dx = self.xs[1] - self.xs[0]
+        dy = self.ys[1] - self.ys[0]
+        ix = np.clip(np.floor(x / dx).astype(int), 0, len(self.xs) - 2)
+        iy = np.clip(np.floor(y / dy).astype(int), 0, len(self.ys) - 2)
+        fx = x / dx - ix
+        fy = y / dy - iy
+
+        def interpolate(grid):
+            top = grid[iy, ix] * (1 - fx) + grid[iy, ix + 1] * fx
+            bottom = grid[iy + 1, ix] * (1 - fx) + grid[iy + 1, ix + 1] * fx
+            return top * (1 - fy) + bottom * fy
+
+        pan = interpolate(self.pan)
+        tilt = interpolate(self.tilt)
+
+        inside = (x >= 0) & (x <= self.width) & (y >= 0) & (y <= self.height)
+        fallback = ~(inside & self.interpolable[iy, ix])
+        if np.any(fallback):
+            exact_pan, exact_tilt = self._exact(x[fallback], y[fallback])
+            pan = np.array(pan, copy=True)
+            tilt = np.array(tilt, copy=True)
+            pan[fallback] = exact_pan
+            tilt[fallback] = exact_tilt
+
+        return pan, tilt
+
+    def max_error(self, samples=10000, random_state=None):
+        """
+        Measure the interpolation error against exact prediction at random stage points.
+
+        Returns:
+        - Dict with the max and mean absolute pan and tilt errors in degrees.
+        """
+        rng = np.random.default_rng(random_state)
+        x = rng.uniform(0, self.width, samples)
+        y = rng.uniform(0, self.height, samples)
+
+        pan, tilt = self.lookup(x, y)
+        exact_pan, exact_tilt = self._exact(x, y)
+        pan_error = np.abs(pan - exact_pan)
+        tilt_error = np.abs(tilt - exact_tilt)
+
+        return {
+            "max_pan_error": float(np.nanmax(pan_error)),
+            "max_tilt_error": float(np.nanmax(tilt_error)),
+            "mean_pan_error": float(np.nanmean(pan_error)),
+            "mean_tilt_error": float(np.nanmean(tilt_error)),
+        }
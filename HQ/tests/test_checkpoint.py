@@ -0,0 +1,94 @@
+import copy
+
+import pytest
+
+from simulator import DEFAULT_RIG, SimulatedRig, run_scan
+
+
+class Crash(Exception):
+    pass
+
+
+def crash_after_first_channel(steps):
+    """
+    A run_scan configure that saves a checkpoint and crashes the navigator the given
+    number of steps after its first channel completed.
+    """
+    def configure(navigator):
+        # Slower than scanning one fixture at a time at the rig's 0.1 s sample period
+        navigator.multiplex_when_slower = True
+        end_step = navigator.end_step
+
+        def crashing_end_step(channels):
+            end_step(channels)
+            if navigator.completed_channels:
+                configure.steps += 1
+                if configure.steps >= steps:
+                    navigator.save_checkpoint()
+                    raise Crash()
+
+        navigator.end_step = crashing_end_step
+
+    configure.steps = 0
+    return configure
+
+
+def test_multiplexed_scan_resumes_without_rescanning_completed_channels(tmp_path):
+    # Hung higher, fixture 2 finds its sensors at lower tilts and completes first
+    rig = copy.deepcopy(DEFAULT_RIG)
+    rig["fixtures"]["2"]["position"] = [22.0, -6.0, 30.0]
+    with pytest.raises(Crash):
+        run_scan(SimulatedRig.from_config(rig, seed=0), "multiplexed", workdir=str(tmp_path),
+                 configure=crash_after_first_channel(100))
+
+    resumed = {}
+
+    def configure(navigator):
+        navigator.multiplex_when_slower = True
+        multiplexed_scan = navigator.multiplexed_scan
+
+        def recording_multiplexed_scan(fixtures):
+            resumed["fixtures"] = list(fixtures)
+            multiplexed_scan(fixtures)
+            resumed["completed"] = list(navigator.completed_channels)
+
+        navigator.multiplexed_scan = recording_multiplexed_scan
+
+    result = run_scan(SimulatedRig.from_config(rig, seed=0), "multiplexed", workdir=str(tmp_path), configure=configure)
+
+    assert len(resumed["fixtures"]) == 1
+    assert sorted(resumed["completed"]) == ["1", "2"]
+    for channel, errors in result["errors"].items():
+        assert len(errors) == 4
+        for pan_error, tilt_error in errors.values():
+            assert abs(pan_error) < 0.1 and abs(tilt_error) < 0.1
+
+
+def test_raster_scan_resumes_from_checkpoint(tmp_path):
+    with pytest.raises(Crash):
+        run_scan(SimulatedRig.from_config(DEFAULT_RIG, seed=0), "raster", workdir=str(tmp_path),
+                 configure=crash_after_first_channel(100))
+
+    replayed = {"steps": 0, "channels": set()}
+
+    def configure(navigator):
+        replay_step = navigator.replay_step
+
+        def counting_replay_step(channels, moves=1):
+            if replay_step(channels, moves):
+                replayed["steps"] += 1
+                replayed["channels"].update(channels)
+                return True
+            return False
+
+        navigator.replay_step = counting_replay_step
+
+    result = run_scan(SimulatedRig.from_config(DEFAULT_RIG, seed=0), "raster", workdir=str(tmp_path), configure=configure)
+
+    # The completed channel is kept, and only the steps of the other one since its start are replayed
+    assert len(replayed["channels"]) == 1
+    assert replayed["steps"] >= 100
+    for channel, errors in result["errors"].items():
+        assert len(errors) == 4
+        for pan_error, tilt_error in errors.values():
+            assert abs(pan_error) < 0.1 and abs(tilt_error) < 0.1
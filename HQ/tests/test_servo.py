@@ -0,0 +1,111 @@
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from EOS import EOS
+from simulator import DEFAULT_RIG, SimulatedGUI, SimulatedRig
+
+
+@pytest.fixture
+def live_rig(tmp_path, monkeypatch):
+    """
+    One fixture of the default rig sampled in real time, with a calibration 0.5° off
+    the true sensor positions and EOS aiming it.
+    """
+    monkeypatch.chdir(tmp_path)
+    rig = SimulatedRig.from_config({"fixtures": {"1": DEFAULT_RIG["fixtures"]["1"]}, "sensors": DEFAULT_RIG["sensors"]}, seed=0)
+    with open(".fixtures.json", "w") as f:
+        json.dump(rig.fixture_data(), f)
+    rng = np.random.default_rng(3)
+    calibration = {}
+    for sensor_id in rig.sensor_ids:
+        pan, tilt = rig.true_pan_tilt("1", sensor_id) + rng.normal(0, 0.5, 2)
+        calibration[str(sensor_id)] = {"pan": float(pan), "tilt": float(tilt), "direction": 1}
+    with open(".sensors.json", "w") as f:
+        json.dump({"1": calibration}, f)
+
+    new_sample = threading.Condition(rig.lock)
+    stop = threading.Event()
+
+    def sample():
+        while not stop.is_set():
+            rig.advance(time.monotonic())
+            with new_sample:
+                new_sample.notify_all()
+            time.sleep(0.005)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+
+    eos = EOS("127.0.0.1", 8000)
+    eos.client = rig
+    eos.attach_sensor_readings(rig.sensor_data, rig.lock, rig.sample_times, new_sample)
+    eos.sensor_baselines = {sensor_id: rig.ambient for sensor_id in rig.sensor_ids}
+    eos.set_intensity("1", 100)
+    yield rig, eos
+    stop.set()
+    sampler.join()
+
+
+def aim_error(rig, x, y):
+    """Degrees between where the rig's fixture 1 points and the stage point (x, y)."""
+    fixture = rig.fixtures["1"]
+    with rig.lock:
+        fixture.advance(time.monotonic())
+        pan, tilt = np.radians(fixture.pan_tilt)
+    beam = np.array([np.sin(tilt) * np.cos(pan), np.sin(tilt) * np.sin(pan), -np.cos(tilt)])
+    offset = np.array([x, y, 0.0]) - fixture.position
+    return float(np.degrees(np.arccos(np.clip(offset @ beam / np.linalg.norm(offset), -1, 1))))
+
+
+@pytest.mark.parametrize("sensor_id", [1, 3])
+def test_move_to_point_servos_onto_sensor(live_rig, sensor_id):
+    rig, eos = live_rig
+    gui = SimulatedGUI(rig)
+    positions = gui.get_sensor_positions_feet()
+    stage_height = gui.get_stage_size_feet()[1]
+    x, y = rig.sensor_positions[rig.sensor_ids.index(sensor_id)]
+
+    thread = eos.move_to_point(*positions[sensor_id], stage_height, positions, "1", servo=True)
+    thread.join()
+
+    assert aim_error(rig, x, y) < 0.1
+    predictor = eos.predictors["1"][1]
+    assert len(predictor.reference_points) == len(rig.sensor_ids) + 1
+    assert sensor_id in eos.last_moves["1"]["observed"]
+
+
+def test_move_to_point_reaims_next_to_sensor(live_rig):
+    rig, eos = live_rig
+    gui = SimulatedGUI(rig)
+    positions = gui.get_sensor_positions_feet()
+    stage_height = gui.get_stage_size_feet()[1]
+    x, y = positions[3][0] + 0.5, positions[3][1] + 0.5
+
+    eos.move_to_point(x, y, stage_height, positions, "1", servo=True).join()
+    time.sleep(0.5)
+
+    assert aim_error(rig, x, stage_height - y) < 0.1
+
+
+def test_lit_sensor_confirms_aim_in_stage_frame(live_rig):
+    rig, eos = live_rig
+    gui = SimulatedGUI(rig)
+    positions = gui.get_sensor_positions_feet()
+    stage_height = gui.get_stage_size_feet()[1]
+
+    eos.move_to_point(*positions[3], stage_height, positions, "1")
+    time.sleep(eos.correspondence_settle + 1.5)
+    with rig.lock:
+        reading = rig.sensor_data[3]
+    eos.observe_sensor_reading(3, reading)
+
+    move = eos.last_moves["1"]
+    predictor = eos.predictors["1"][1]
+    assert 3 in move["observed"]
+    # Recorded where the fixture was aimed: the sensor's true position, at the move's pan/tilt
+    assert predictor.reference_points[-1][:2] == pytest.approx(tuple(rig.sensor_positions[rig.sensor_ids.index(3)]))
+    assert predictor.observation_errors[-1] < 0.01
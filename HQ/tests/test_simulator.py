@@ -0,0 +1,71 @@
+import os
+import shutil
+
+import pytest
+
+from simulator import DEFAULT_RIG, SimulatedRig, run_scan
+
+# Worst pan or tilt error in degrees of each mode's calibration of the default rig.
+# The sweep samples while the fixture is moving, so it is the coarsest.
+ERROR_BOUNDS = {
+    "raster": 0.15,
+    "hierarchical": 0.15,
+    "sweep": 0.5,
+    "adaptive": 0.15,
+    "guided": 0.15,
+    "pipelined": 0.15,
+    "multiplexed": 0.15,
+}
+
+
+def worst_error(result):
+    return max(max(abs(pan), abs(tilt)) for errors in result["errors"].values() for pan, tilt in errors.values())
+
+
+def allow_multiplexing(navigator):
+    # Slower than scanning one fixture at a time at the rig's 0.1 s sample period
+    navigator.multiplex_when_slower = True
+
+
+@pytest.fixture(scope="module")
+def raster_scan(tmp_path_factory):
+    workdir = str(tmp_path_factory.mktemp("raster"))
+    return run_scan(SimulatedRig.from_config(DEFAULT_RIG, seed=0), "raster", workdir=workdir)
+
+
+@pytest.fixture(scope="module")
+def recalibrations(raster_scan, tmp_path_factory):
+    """Runs each mode as a recalibration after the raster scan, with its settle-time self-test."""
+    results = {}
+
+    def recalibrate(mode):
+        if mode not in results:
+            workdir = str(tmp_path_factory.mktemp(mode))
+            shutil.copytree(raster_scan["workdir"], workdir, dirs_exist_ok=True)
+            os.replace(os.path.join(workdir, ".sensors.json"), os.path.join(workdir, ".sensors_archive.json"))
+            results[mode] = run_scan(SimulatedRig.from_config(DEFAULT_RIG, seed=1), mode, workdir=workdir,
+                                     configure=allow_multiplexing)
+        return results[mode]
+
+    return recalibrate
+
+
+def test_raster_scan_locates_every_sensor(raster_scan):
+    assert {channel: len(errors) for channel, errors in raster_scan["errors"].items()} == {"1": 4, "2": 4}
+    assert worst_error(raster_scan) < ERROR_BOUNDS["raster"]
+
+
+@pytest.mark.parametrize("mode", sorted(ERROR_BOUNDS))
+def test_recalibration_locates_every_sensor(recalibrations, mode):
+    result = recalibrations(mode)
+    assert {channel: len(errors) for channel, errors in result["errors"].items()} == {"1": 4, "2": 4}
+    assert worst_error(result) < ERROR_BOUNDS[mode]
+
+
+@pytest.mark.parametrize("mode", ["hierarchical", "sweep", "adaptive", "guided"])
+def test_recalibration_is_faster_than_raster(raster_scan, recalibrations, mode):
+    assert recalibrations(mode)["simulated_time"] < raster_scan["simulated_time"]
+
+
+def test_guided_scan_is_faster_than_adaptive(recalibrations):
+    assert recalibrations("guided")["simulated_time"] < recalibrations("adaptive")["simulated_time"]